@@ -2,18 +2,21 @@
 
 
 # basic built-in libraries required
-from enum import Enum
+from enum import IntEnum
+import array
+import copy
+import numpy as np
 
 
 # agents can either cooperate or defect in the PD
-class Choice(Enum):
-    # assign arbitrary integers to represent the choice
+class Choice(IntEnum):
+    # assign arbitrary integers to represent the choice, also used directly as indices into tables
     COOPERATE = 0
     DEFECT = 1
 
     # get integer version of decision
     def get_value(self):
-        return -2 * self.value + 1
+        return VALUES[self]
             
     # ensure printed version is properly formatted
     def __str__(self):
@@ -23,14 +26,144 @@ class Choice(Enum):
             return "DEFECT"
 
 
+# choices indexed by their integer value, avoids going through enum lookup when reading stored rounds
+CHOICES = (Choice.COOPERATE, Choice.DEFECT)
+# integer version of each decision, cached so it is not recomputed every round
+VALUES = (1, -1)
+
+
+# view of a single round stored in a history log, behaves like a played PD round
+class Round():
+    # only the log and the position within it are stored, results are read from the log on demand
+    def __init__(self, history, iteration):
+        self.__history = history
+        self.__iteration = iteration
+        return
+
+    # return the log this round is stored in
+    def get_history(self):
+        return self.__history
+
+    # return the index of this round within the IPD
+    def get_iteration(self):
+        return self.__iteration
+
+    # return the choices made by each agent this round
+    def get_choices(self):
+        return self.__history.get_round_choices(self.__iteration)
+
+    # return the scores achieved by each agent this round
+    def get_scores(self):
+        return self.__history.get_round_scores(self.__iteration)
+
+
+# return the narrowest dtype that holds every reward of the matrix (and so every score of a round), integers if the
+# rewards all are, otherwise floats
+def get_score_dtype(reward_matrix):
+    rewards = np.asarray(reward_matrix)
+    if not np.issubdtype(rewards.dtype, np.integer):
+        return np.dtype(np.float64)
+    largest = int(np.max(np.abs(rewards))) if rewards.size else 0
+    for dtype in (np.int8, np.int16, np.int32):
+        if largest <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+# compact log of rounds played, choices and scores are stored in preallocated flat arrays rather than objects
+class History():
+    # reserve room for the expected number of rounds, grows if more are played, scores are stored as the given dtype or,
+    # if None, as int64 or float64 depending on the first round's scores
+    def __init__(self, capacity=0, score_dtype=None):
+        # one byte per choice (int8) and one typed slot per score, two per round
+        self.__choices = bytearray(2 * capacity)
+        self.__scores = (array.array(np.dtype(score_dtype).char, [0]) * (2 * capacity) if score_dtype is not None else None)
+        self.__length = 0
+        return
+
+    # return the number of rounds logged so far
+    def __len__(self):
+        return self.__length
+
+    # return a view of the round (or list of rounds for a slice) at the given index
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Round(self, i) for i in range(*index.indices(self.__length))]
+        if index < 0:
+            index += self.__length
+        if (index < 0) or (index >= self.__length):
+            raise IndexError("History index out of range")
+        return Round(self, index)
+
+    # iterate over views of all rounds logged so far
+    def __iter__(self):
+        for i in range(self.__length):
+            yield Round(self, i)
+
+    # return the choices made in all rounds as an int8 array without copying, 0 cooperates and 1 defects
+    def get_choices(self):
+        return np.frombuffer(self.__choices, dtype=np.int8).reshape(-1, 2)[:self.__length]
+
+    # return the scores achieved in all rounds as an array without copying
+    def get_scores(self):
+        if self.__scores is None:
+            return np.zeros((0, 2), dtype=np.int64)
+        return np.frombuffer(self.__scores, dtype=self.__scores.typecode).reshape(-1, 2)[:self.__length]
+
+    # return the choices made by each agent in a single round
+    def get_round_choices(self, iteration):
+        return (CHOICES[self.__choices[2 * iteration]], CHOICES[self.__choices[2 * iteration + 1]])
+
+    # return the scores achieved by each agent in a single round
+    def get_round_scores(self, iteration):
+        return (self.__scores[2 * iteration], self.__scores[2 * iteration + 1])
+
+    # log the choices and scores of a new round, doubling storage if it is full
+    def append(self, choices, scores):
+        i = 2 * self.__length
+        if self.__scores is None:
+            dtype = (np.int64 if np.issubdtype(np.asarray(scores).dtype, np.integer) else np.float64)
+            self.__scores = array.array(np.dtype(dtype).char, [0]) * len(self.__choices)
+        if i == len(self.__choices):
+            self.__choices.extend(bytes(max(i, 2)))
+            self.__scores.extend(array.array(self.__scores.typecode, [0]) * max(i, 2))
+        self.__choices[i] = choices[0]
+        self.__choices[i + 1] = choices[1]
+        self.__scores[i] = scores[0]
+        self.__scores[i + 1] = scores[1]
+        self.__length += 1
+        return Round(self, self.__length - 1)
+
+    # log more rounds by repeating all those from start onwards, used once a game is known to cycle
+    def repeat(self, start, n_rounds):
+        period = self.__length - start
+        end = self.__length + n_rounds
+        if 2 * end > len(self.__choices):
+            self.__choices.extend(bytes(2 * end - len(self.__choices)))
+            self.__scores.extend(array.array(self.__scores.typecode, [0]) * (2 * end - len(self.__scores)))
+        n_copies = n_rounds // period + 1
+        self.__choices[2 * self.__length:2 * end] = (self.__choices[2 * start:2 * self.__length] * n_copies)[:2 * n_rounds]
+        self.__scores[2 * self.__length:2 * end] = (self.__scores[2 * start:2 * self.__length] * n_copies)[:2 * n_rounds]
+        self.__length = end
+        return
+
+    # log a played round unless it is already stored in this history
+    def record(self, round):
+        if isinstance(round, Round) and (round.get_history() is self):
+            return round
+        return self.append(round.get_choices(), round.get_scores())
+
+
 # abstract class that defines generic behavior of IPD-playing agent
 class Agent():
+    # agents whose decisions depend only on the game so far, no randomness or outside input
+    deterministic = False
+
     # all agents must keep track of past rounds and their cumulative score
     def __init__(self, name):
         self.__name = name
-        self.__score = 0
-        self.__position = None
-        self.__history = []
+        # subclasses set up their own running state by extending reset
+        self.reset(None)
         return
     
     # ensure printed version is properly formatted
@@ -49,18 +182,67 @@ class Agent():
     def get_history(self):
         return self.__history
 
+    # return the parameters that configure the agent's behavior, none for general agent
+    def get_params(self):
+        return {}
+
     # set up new instantiation of agent, store where it is within the game
     def reset(self, position):
         self.__score = 0
         self.__position = position
-        self.__history = []
+        self.__history = History()
+        # random numbers for the game are handed over by it in advance, see set_random
+        self.__draws = None
+        self.__n_draws = 0
+        self.__rng = None
+        return
+
+    # create a fresh instance for a new game, sharing all fixed parameters with this one
+    def clone(self, position):
+        agent = copy.copy(self)
+        # only the per-game state is rebuilt, reset must set up everything that changes while playing
+        agent.reset(position)
+        return agent
+
+    # use the log of the game being played rather than a separate one, so rounds are only stored once
+    def share_history(self, history):
+        self.__history = history
+        return
+
+    # store uniform random numbers in [0, 1) drawn by the game from its own stream, one for each round
+    def set_random(self, draws):
+        self.__draws = draws
+        self.__n_draws = 0
+        return
+
+    # return the next uniform random number in [0, 1), from the game's draws or, outside of one, the agent's own stream
+    def random(self):
+        if (self.__draws is not None) and (self.__n_draws < len(self.__draws)):
+            self.__n_draws += 1
+            return self.__draws[self.__n_draws - 1]
+        if self.__rng is None:
+            self.__rng = np.random.default_rng()
+        return self.__rng.random()
+
+    # credit points from rounds that were not played out one at a time
+    def add_score(self, points):
+        self.__score += points
         return
 
+    # return a hashable summary of everything that determines future decisions, only needed by deterministic agents
+    def get_state(self):
+        raise NotImplementedError("General agent has no known state")
+
     # store results of each round to inform future decisions
     def update_history(self, round):
         # need to index prisoner's dilemma result with this agent's position
         self.__score += round.get_scores()[self.get_position()]
-        self.__history.append(round)
+        self.__history.record(round)
+        self.observe(round)
+        return
+
+    # update running summaries of the game after each round, so decisions need not scan the whole history
+    def observe(self, round):
         return
 
     # abstract method to play a round of the PD in the IPD, decision must be implemented by subclass
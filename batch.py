@@ -0,0 +1,223 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import time
+# other code developed for project
+from tournament import *
+from population import *
+from kernels import *
+
+
+# return whether the batch engine can play all the agents, which it can for Picard agents and agents with strategy tables
+def can_batch(agents):
+    if isinstance(agents, Population):
+        return all((AGENT_TYPES[t][0] is PicardAgent) or (AGENT_TYPES[t][0] in STRATEGY_TABLES) for t in np.unique(agents.get_table()["type"]))
+    return all(isinstance(agent, PicardAgent) or (get_strategy_table(agent) is not None) for agent in agents)
+
+
+# represents a round robin of Picard agents and finite-state agents where all matchups are stepped together as arrays
+class BatchTournament():
+    # set up tournament with IPD parameters and agents to test, chunk size is the number of matchups stepped together,
+    # finished matchups are optionally streamed to a writer, timings optionally collected into metrics, and games are played
+    # by the compiled kernel when numba is installed unless compiled is False, where noise is drawn for at most block size
+    # rounds of games at a time so memory stays bounded however long the games are
+    def __init__(self, n_iterations, reward_matrix, agents, chunk_size=4096, sink=None, seed=None, metrics=None, compiled=True, block_size=1 << 22):
+        self.__n_iterations = n_iterations
+        self.__reward_matrix = reward_matrix
+        self.__agents = agents
+        # every game gets its own block of one random stream seeded by this, the same ones as in Tournament
+        self.__seed = (seed if seed is not None else np.random.SeedSequence())
+        self.__chunk_size = chunk_size
+        self.__block_size = block_size
+        self.__sink = sink
+        self.__metrics = metrics
+        self.__compiled = (compiled and (compiled_play_picard_games is not None))
+        self.__matchup_scores = None
+        self.__scores = [0] * len(self.__agents)
+        return
+
+    # return the total scores achieved by each agent across all matchups
+    def get_scores(self):
+        return self.__scores
+
+    # return score of each agent (row) against each agent (column) in the tournament played
+    def get_payoffs(self):
+        return get_payoff_matrix(len(self.__agents), self.__matchup_scores)
+
+    # return uniform draws of rounds t0 to t0 + n_rounds of each of a block of games starting with the k-th matchup, one
+    # column per agent, taken from each game's own block of the stream exactly as IteratedPrisonersDilemma does, where
+    # games marked as not random (between deterministic agents) draw nothing and get zeros
+    def get_draws(self, k, random, t0, n_rounds):
+        draws = np.zeros((len(random), n_rounds, 2))
+        games = np.flatnonzero(random)
+        if len(games) == 0:
+            return draws
+        if n_rounds == self.__n_iterations:
+            # whole games lie back to back in the stream, so each run of consecutive games is drawn in one call
+            starts = games[np.append(True, np.diff(games) > 1)]
+            ends = games[np.append(np.diff(games) > 1, True)] + 1
+        else:
+            starts, ends = games, games + 1
+        # the generator only moves forwards, skipping numbers of other rounds and games rather than drawing them
+        generator, position = get_game_generator(self.__seed, k, self.__n_iterations), 0
+        for (start, end) in zip(starts.tolist(), ends.tolist()):
+            offset = 2 * (start * self.__n_iterations + t0)
+            generator.bit_generator.advance(offset - position)
+            draws[start:end] = generator.random((end - start, n_rounds, 2))
+            position = offset + 2 * (end - start) * n_rounds
+        return draws
+
+    # play a block of matchups between agents at indices i and j, starting with the k-th matchup of the round robin,
+    # return the total score of each side and, if they are streamed, the choices of each round
+    def play_matchups(self, k, i, j, params):
+        n_matchups = len(i)
+        # personality parameters of each side, row 0 is first position and row 1 is second position
+        a = np.stack((params["a"][i], params["a"][j]))
+        b = np.stack((params["b"][i], params["b"][j]))
+        e = np.stack((params["e"][i], params["e"][j]))
+        noise = np.stack((params["noise_param"][i], params["noise_param"][j]))
+        cognitive = np.stack((params["cognitive_param"][i], params["cognitive_param"][j]))
+        # which sides are Picard agents, and the table state of the others
+        picard = np.stack((params["picard"][i], params["picard"][j]))
+        state = np.stack((params["state"][i], params["state"][j]))
+        defect, transitions = params["defect"], params["transitions"]
+        has_picard, has_tables = bool(np.any(picard)), (not np.all(picard))
+        # mood and cognitive expectation start neutral, input is 0 in first round
+        c = np.zeros((2, n_matchups))
+        d = np.zeros((2, n_matchups))
+        x = np.zeros((2, n_matchups))
+        # games between deterministic agents draw no noise
+        random = ~(params["deterministic"][i] & params["deterministic"][j])
+        # payoffs indexed by (own choice, opponent choice) where 0 cooperates and 1 defects
+        payoffs = np.array([[self.__reward_matrix[2], self.__reward_matrix[0]], [self.__reward_matrix[3], self.__reward_matrix[1]]])
+        totals = np.zeros((2, n_matchups), dtype=payoffs.dtype)
+        moves = (np.zeros((n_matchups, self.__n_iterations, 2), dtype=np.uint8) if (self.__sink is not None) and self.__sink.keeps_moves() else None)
+        decisions, table_decisions, rewards = 0, 0, 0
+        if self.__compiled and not has_tables:
+            # each game runs start to finish in one compiled loop, so deciding and rewarding are timed together, and games
+            # are played a few whole ones at a time so their noise fits in a block
+            n_games = max(1, self.__block_size // self.__n_iterations)
+            for g in range(0, n_matchups, n_games):
+                games = slice(g, g + n_games)
+                with timer(self.__metrics, "draws"):
+                    flips = (self.get_draws(k + g, random[games], 0, self.__n_iterations) < 1 / noise[:, games].T[:, None, :])
+                start = time.perf_counter()
+                compiled_play_picard_games(a[:, games], b[:, games], e[:, games], cognitive[:, games], flips, payoffs, totals[:, games], (moves[games] if moves is not None else np.zeros((0, 0, 2), dtype=np.uint8)))
+                decisions += time.perf_counter() - start
+        else:
+            # every game is stepped together, so noise is drawn for a block of rounds of all of them at a time
+            n_rounds = max(1, self.__block_size // max(n_matchups, 1))
+            for t in range(self.__n_iterations):
+                if t % n_rounds == 0:
+                    with timer(self.__metrics, "draws"):
+                        draws = self.get_draws(k, random, t, min(n_rounds, self.__n_iterations - t))
+                        flips = (draws < 1 / noise.T[:, None, :])
+                if self.__metrics is not None:
+                    start = time.perf_counter()
+                if has_picard:
+                    # same update as PicardAgent.play, expectation only includes last decision from the third round on
+                    d /= 2
+                    if t >= 2:
+                        d += x / cognitive
+                    y = 2 * a / (1 + np.exp(-b * (x + c))) - a - d
+                    c = y
+                    # defect below threshold, then sometimes random noise changes decision
+                    choices = (y < -e) ^ flips[:, t % n_rounds, :].T
+                if self.__metrics is not None:
+                    decided = time.perf_counter()
+                if has_tables:
+                    # other agents defect as their current state says, using the round's draw in random states
+                    table_choices = (draws[:, t % n_rounds, :].T < defect[state])
+                    choices = (np.where(picard, choices, table_choices) if has_picard else table_choices)
+                if self.__metrics is not None:
+                    table_decided = time.perf_counter()
+                totals[0] += payoffs[choices[0].astype(int), choices[1].astype(int)]
+                totals[1] += payoffs[choices[1].astype(int), choices[0].astype(int)]
+                if moves is not None:
+                    moves[:, t, :] = choices.T
+                if has_picard:
+                    # input next round is opponent's last decision as +1 for cooperate and -1 for defect
+                    x = 1 - 2 * choices[::-1].astype(float)
+                if has_tables:
+                    state = transitions[state, choices.astype(int), choices[::-1].astype(int)]
+                if self.__metrics is not None:
+                    decisions += decided - start
+                    table_decisions += table_decided - decided
+                    rewards += time.perf_counter() - table_decided
+        if self.__metrics is not None:
+            n_picard = int(np.count_nonzero(picard)) * self.__n_iterations
+            self.__metrics.add_time("decisions", decisions + table_decisions, 2 * n_matchups * self.__n_iterations)
+            self.__metrics.add_time("rewards", rewards, n_matchups * self.__n_iterations)
+            if has_picard:
+                self.__metrics.add_decisions("PicardAgent", n_picard, decisions)
+            if has_tables:
+                self.__metrics.add_decisions("StrategyTable", 2 * n_matchups * self.__n_iterations - n_picard, table_decisions)
+            self.__metrics.add_count("rounds played", n_matchups * self.__n_iterations)
+        return totals, moves
+
+    # play a round robin of the IPD, same matchups and order as Tournament.play
+    def play(self):
+        with timer(self.__metrics, "tournament"):
+            return self.play_round_robin()
+
+    # return arrays of every parameter of the agents, indexed like the agents, as used by play_matchups, where agents that
+    # are not Picard agents play their strategy tables
+    def get_params(self):
+        # populations stored as a table already have their parameters as arrays
+        if isinstance(self.__agents, Population):
+            return self.__agents.get_params()
+        tables, table_ids, seen = [], [], {}
+        for agent in self.__agents:
+            if isinstance(agent, PicardAgent):
+                table_ids.append(-1)
+                continue
+            table = get_strategy_table(agent)
+            if table is None:
+                raise TypeError("Batch tournament can only play Picard agents and agents with strategy tables")
+            # agents playing the same table share its states
+            if id(table) not in seen:
+                seen[id(table)] = len(tables)
+                tables.append(table)
+            table_ids.append(seen[id(table)])
+        picard = [isinstance(agent, PicardAgent) for agent in self.__agents]
+        params = {key: np.array([(agent.get_params()[key] if is_picard else PLACEHOLDER_PARAMS[key]) for (agent, is_picard) in zip(self.__agents, picard)], dtype=float) for key in ("a", "b", "e")}
+        params["noise_param"] = np.array([(agent.get_noise_param() if is_picard else noise_param) for (agent, is_picard) in zip(self.__agents, picard)])
+        params["cognitive_param"] = np.array([(agent.get_cognitive_param() if is_picard else cognitive_param) for (agent, is_picard) in zip(self.__agents, picard)])
+        params.update(get_table_params(table_ids, tables))
+        return params
+
+    # return the class name of each agent, as recorded in metrics
+    def get_type_names(self):
+        if isinstance(self.__agents, Population):
+            return [AGENT_TYPES[t][0].__name__ for t in self.__agents.get_table()["type"]]
+        return [type(agent).__name__ for agent in self.__agents]
+
+    # step every matchup of the round robin in chunks and total the scores
+    def play_round_robin(self):
+        params = self.get_params()
+        names = (self.get_type_names() if self.__metrics is not None else None)
+        # each agent plays all others once and itself
+        i, j = np.triu_indices(len(self.__agents))
+        scores = np.zeros(len(self.__agents), dtype=np.asarray(self.__reward_matrix).dtype)
+        if self.__sink is not None:
+            self.__sink.start_tournament()
+        self.__matchup_scores = np.zeros((len(i), 2), dtype=scores.dtype)
+        for k in range(0, len(i), self.__chunk_size):
+            totals, moves = self.play_matchups(k, i[k:k + self.__chunk_size], j[k:k + self.__chunk_size], params)
+            self.__matchup_scores[k:k + self.__chunk_size] = totals.T
+            np.add.at(scores, i[k:k + self.__chunk_size], totals[0])
+            np.add.at(scores, j[k:k + self.__chunk_size], totals[1])
+            # stream summary of each game to disk
+            if self.__sink is not None:
+                with timer(self.__metrics, "sink"):
+                    for m in range(len(totals[0])):
+                        self.__sink.write(int(i[k + m]), int(j[k + m]), totals[:, m].tolist(), (moves[m] if moves is not None else None))
+            if self.__metrics is not None:
+                self.__metrics.add_count("matchups played", len(totals[0]))
+                for m in range(len(totals[0])):
+                    self.__metrics.add_matchup(names[i[k + m]], names[j[k + m]], totals[:, m].tolist())
+        self.__scores = scores.tolist()
+        # return scores for subsequent data analysis
+        return self.get_scores()
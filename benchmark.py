@@ -0,0 +1,185 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+# other code developed for project
+from tournament import *
+from batch import *
+
+
+# rational agent types, in the order they are cycled through when building populations
+RATIONAL_TYPES = (TitForTatAgent, TitForTwoTatsAgent, GrudgerAgent, DetectiveAgent, RandomAgent, NiceAgent, NastyAgent)
+# ranges of Picard parameters that populations are drawn from
+PICARD_RANGES = {"a": (0.5, 3), "b": (0.5, 5), "e": (-1, 1)}
+# reward structure used by every case
+REWARD_MATRIX = [0, 1, 3, 5]
+# peak memory below this many bytes is treated as this many, so noise in tiny cases is not flagged as a regression
+MEMORY_FLOOR = 1 << 20
+
+
+# build a population of the given mix of agent types, Picard parameters drawn from the seed
+def get_agents(mix, n_agents, seed=0):
+    rng = np.random.default_rng(seed)
+    agents = []
+    for i in range(n_agents):
+        # mixed populations alternate between rational and Picard agents
+        if (mix == "rational") or ((mix == "mixed") and (i % 2 == 0)):
+            agent_type = RATIONAL_TYPES[(i // 2 if mix == "mixed" else i) % len(RATIONAL_TYPES)]
+            agents.append(agent_type(f"{agent_type.__name__}{i}"))
+        elif mix in ("picard", "mixed"):
+            params = {name: round(float(rng.uniform(low, high)), 2) for (name, (low, high)) in PICARD_RANGES.items()}
+            agents.append(PicardAgent(f"Picard{i}", params))
+        else:
+            raise ValueError(f"Unknown agent mix {mix}")
+    return agents
+
+
+# play single PD rounds between two agents, each keeping its own history
+def run_pd(agents, n_iterations):
+    agent_a, agent_b = agents[0].clone(0), agents[1].clone(1)
+    for i in range(n_iterations):
+        PrisonersDilemma(i, REWARD_MATRIX, agent_a, agent_b).play()
+    return
+
+
+# play one IPD game between two agents, every round played out so this measures per-round cost rather than cycle skipping
+def run_ipd(agents, n_iterations):
+    IteratedPrisonersDilemma(n_iterations, REWARD_MATRIX, agents[0].clone(0), agents[1].clone(1), detect_cycles=False, seed=0).play()
+    return
+
+
+# play a whole serial tournament with default settings
+def run_tournament(agents, n_iterations):
+    Tournament(n_iterations, REWARD_MATRIX, agents, seed=0).play()
+    return
+
+
+# play the same tournament with every matchup stepped together as arrays, as experiments do
+def run_batch(agents, n_iterations):
+    BatchTournament(n_iterations, REWARD_MATRIX, agents, seed=0).play()
+    return
+
+
+# function to time, number of agents it needs, and number of matchups and rounds it plays for each benchmark
+BENCHMARKS = {
+    "pd": (run_pd, lambda n_agents: 2, lambda n_agents, n_iterations: (0, n_iterations)),
+    "ipd": (run_ipd, lambda n_agents: 2, lambda n_agents, n_iterations: (1, n_iterations)),
+    "tournament": (run_tournament, lambda n_agents: n_agents, lambda n_agents, n_iterations: (n_agents * (n_agents + 1) // 2, n_agents * (n_agents + 1) // 2 * n_iterations)),
+    "batch": (run_batch, lambda n_agents: n_agents, lambda n_agents, n_iterations: (n_agents * (n_agents + 1) // 2, n_agents * (n_agents + 1) // 2 * n_iterations)),
+}
+# benchmarks of whole round robins, which depend on the number of agents
+ROUND_ROBIN_BENCHMARKS = ("tournament", "batch")
+
+
+# time one case as the best of several runs, then measure its peak memory in a separate traced run
+def run_case(benchmark, mix, n_agents, n_iterations, n_repeats=3):
+    function, get_n_agents, get_size = BENCHMARKS[benchmark]
+    agents = get_agents(mix, get_n_agents(n_agents))
+    n_matchups, n_rounds = get_size(n_agents, n_iterations)
+    seconds = float("inf")
+    for i in range(n_repeats):
+        start = time.perf_counter()
+        function(agents, n_iterations)
+        seconds = min(seconds, time.perf_counter() - start)
+    # tracing slows everything down, so it is kept out of the timed runs
+    tracemalloc.start()
+    function(agents, n_iterations)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {
+        "name": get_case_name(benchmark, mix, n_agents, n_iterations),
+        "benchmark": benchmark,
+        "mix": mix,
+        "n_agents": get_n_agents(n_agents),
+        "n_iterations": n_iterations,
+        "seconds": seconds,
+        "rounds_per_second": n_rounds / seconds,
+        "peak_memory": peak_memory,
+    }
+    if n_matchups:
+        result["matchups_per_second"] = n_matchups / seconds
+    return result
+
+
+# return the key a case is stored and compared under
+def get_case_name(benchmark, mix, n_agents, n_iterations):
+    if benchmark in ROUND_ROBIN_BENCHMARKS:
+        return f"{benchmark}/{mix}/n_agents={n_agents}/n_iterations={n_iterations}"
+    return f"{benchmark}/{mix}/n_iterations={n_iterations}"
+
+
+# run every case of the grid whose number of rounds fits in the budget, largest cases are skipped rather than run for hours,
+# where the batch engine has its own budget (the same one if not given) since it plays rounds far faster and draws noise
+# in blocks of bounded size, so its memory does not grow with the number of rounds the way serial tournaments' does
+def run_suite(benchmarks, mixes, agent_counts, iteration_counts, max_rounds, n_repeats=3, batch_max_rounds=None):
+    results = []
+    for benchmark in benchmarks:
+        # only tournaments depend on the number of agents, the others always play a single pair
+        counts = agent_counts if benchmark in ROUND_ROBIN_BENCHMARKS else [2]
+        budget = (batch_max_rounds if (benchmark == "batch") and (batch_max_rounds is not None) else max_rounds)
+        for (mix, n_agents, n_iterations) in itertools.product(mixes, counts, iteration_counts):
+            n_rounds = BENCHMARKS[benchmark][2](n_agents, n_iterations)[1]
+            if n_rounds > budget:
+                print(f"{get_case_name(benchmark, mix, n_agents, n_iterations):<55} skipped ({n_rounds:,} rounds over budget)")
+                continue
+            result = run_case(benchmark, mix, n_agents, n_iterations, n_repeats)
+            print(f"{result['name']:<55} {result['rounds_per_second']:>14,.0f} rounds/s {result['peak_memory'] / 1e6:>10.2f} MB")
+            results.append(result)
+    return results
+
+
+# compare results to those of a baseline run, return names of cases that are slower or use more memory than the threshold allows
+def compare(results, baseline, threshold):
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        if result["name"] not in previous:
+            continue
+        speed = result["rounds_per_second"] / previous[result["name"]]["rounds_per_second"]
+        memory = max(result["peak_memory"], MEMORY_FLOOR) / max(previous[result["name"]]["peak_memory"], MEMORY_FLOOR)
+        regressed = (speed < 1 - threshold) or (memory > 1 + threshold)
+        print(f"{result['name']:<55} {speed:>8.2f}x speed {memory:>8.2f}x memory{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput and memory of the PD, IPD, tournament, and batch tournament engines.")
+    parser.add_argument("--benchmarks", nargs="+", default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument("--mixes", nargs="+", default=["rational", "picard", "mixed"], choices=["rational", "picard", "mixed"])
+    parser.add_argument("--agents", nargs="+", type=int, default=[10, 50, 200, 1000])
+    parser.add_argument("--iterations", nargs="+", type=int, default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--max-rounds", type=int, default=10000000, help="skip cases that play more rounds than this")
+    parser.add_argument("--batch-max-rounds", type=int, default=1000000000, help="skip batch tournament cases that play more rounds than this, their memory is bounded by the batch engine's block size")
+    parser.add_argument("--repeats", type=int, default=3, help="time each case as the best of this many runs")
+    parser.add_argument("--output", help="save results to this JSON file")
+    parser.add_argument("--baseline", help="compare results to those saved in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed fractional loss of speed or gain of memory")
+    args = parser.parse_args()
+
+    results = run_suite(args.benchmarks, args.mixes, args.agents, args.iterations, args.max_rounds, args.repeats, args.batch_max_rounds)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump({"python": platform.python_version(), "numpy": np.__version__, "results": results}, file, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} of {len(results)} cases regressed beyond {args.threshold:.0%}")
+            sys.exit(1)
+    return
+
+
+# run main function if called as program
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+from collections import OrderedDict
+import pickle
+import os
+
+
+# remembers results of matchups between deterministic agents, which are the same every time they are played
+class MatchupCache():
+    # set up cache holding at most max_size results, optionally loaded from and saved to a file
+    def __init__(self, max_size=100000, path=None):
+        self.__max_size = max_size
+        self.__path = path
+        self.__results = OrderedDict()
+        if (self.__path is not None) and os.path.exists(self.__path):
+            self.load()
+        return
+
+    # save cache at end of with block so results played in it are kept for later runs
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    # return the number of results currently stored
+    def __len__(self):
+        return len(self.__results)
+
+    # identify a matchup by both agents' types and parameters (in order of position) and the IPD settings
+    def get_key(self, agent_a, agent_b, n_iterations, reward_matrix):
+        return (
+            type(agent_a).__name__,
+            tuple(sorted(agent_a.get_params().items())),
+            type(agent_b).__name__,
+            tuple(sorted(agent_b.get_params().items())),
+            n_iterations,
+            tuple(reward_matrix),
+        )
+
+    # return the stored scores of a matchup, or None if it has not been played yet
+    def get(self, key):
+        if key not in self.__results:
+            return None
+        # mark as most recently used
+        self.__results.move_to_end(key)
+        return self.__results[key]
+
+    # store the scores of a matchup, evicting the least recently used results if the cache is full
+    def put(self, key, scores):
+        self.__results[key] = scores
+        self.__results.move_to_end(key)
+        while len(self.__results) > self.__max_size:
+            self.__results.popitem(last=False)
+        return
+
+    # read stored results from the cache file, most recently used last
+    def load(self):
+        with open(self.__path, "rb") as file:
+            self.__results = pickle.load(file)
+        while len(self.__results) > self.__max_size:
+            self.__results.popitem(last=False)
+        return
+
+    # write stored results to the cache file (if there is one), replacing it in one step so an interrupted save cannot
+    # corrupt it
+    def save(self):
+        if self.__path is None:
+            return
+        with open(self.__path + ".tmp", "wb") as file:
+            pickle.dump(self.__results, file)
+        os.replace(self.__path + ".tmp", self.__path)
+        return
+
+    # write stored results to the cache file
+    def close(self):
+        self.save()
+        return
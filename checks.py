@@ -0,0 +1,99 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import multiprocessing
+import tempfile
+import sys
+import os
+# other code developed for project
+import runner
+from runner import *
+from strategies import *
+
+
+# settings of the small experiments the checks run
+N_ITERATIONS = 50
+REWARD_MATRIX = [0, 1, 3, 5]
+
+
+# return a handful of Picard agents with varied personalities
+def get_check_agents(n_agents=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [PicardAgent(f"Picard {i}", {"a": round(float(rng.uniform(0.5, 3)), 2), "b": round(float(rng.uniform(0.5, 4)), 2), "e": round(float(rng.uniform(-1, 1)), 2)}) for i in range(n_agents)]
+
+
+# run an experiment in this process and stop it without saving anything on the way out once kill_at tournaments are done,
+# as if the machine running it went down
+def run_killed(checkpoint, kill_at, agents, n_err, n_trials, seed):
+    play = runner.play_tournaments
+
+    def limited(*args, **kwargs):
+        for (n, scores) in enumerate(play(*args, **kwargs)):
+            if n == kill_at:
+                os._exit(1)
+            yield scores
+
+    runner.play_tournaments = limited
+    ExperimentRunner(checkpoint, 5, seed, progress=False).run(N_ITERATIONS, REWARD_MATRIX, agents, n_err, n_trials, n_workers=1)
+    return
+
+
+# return whether runs killed after each of the given numbers of tournaments and then resumed from their checkpoints end
+# with exactly the results of a run that was never stopped
+def check_resume(kill_ats=(5, 6, 8), n_err=2, n_trials=5, seed=7):
+    agents = get_check_agents()
+    expected = ExperimentRunner(seed=seed, progress=False).run(N_ITERATIONS, REWARD_MATRIX, agents, n_err, n_trials, n_workers=1)
+    passed = True
+    for kill_at in kill_ats:
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, "checkpoint.pkl")
+            process = multiprocessing.Process(target=run_killed, args=(checkpoint, kill_at, agents, n_err, n_trials, seed))
+            process.start()
+            process.join()
+            resumed = ExperimentRunner(checkpoint, 5, progress=False)
+            n_done = resumed.get_n_done()
+            totals = resumed.run(N_ITERATIONS, REWARD_MATRIX, agents, n_err, n_trials, n_workers=1)
+        same = bool(np.array_equal(totals, expected))
+        print(f"resume after kill at {kill_at} (checkpoint of {n_done}): {'ok' if same else 'MISMATCH'}")
+        passed = passed and same
+    return passed
+
+
+# return whether the batch engine plays exactly the games of the scalar one for tournaments of Picard agents, rational
+# agents, and tables mixing fixed and random states, over several seeds
+def check_engines(seeds=range(5)):
+    tables = [
+        TableAgent("Sometimes Retaliating", get_reactive_table([0, 0.7], [[0, 1], [0, 1]])),
+        TableAgent("Noisy Pavlov", StrategyTable([0.1, 1], [[[0, 1], [1, 0]], [[0, 1], [1, 0]]])),
+    ]
+    rational = [NiceAgent("Nice"), RandomAgent("Random"), TitForTatAgent("Tit for Tat"), DetectiveAgent("Detective")]
+    passed = True
+    for (name, agents) in (("tables", get_check_agents(4) + tables), ("mixed", get_check_agents(4) + rational + tables)):
+        same = all(Tournament(N_ITERATIONS, REWARD_MATRIX, agents, seed=seed).play() == BatchTournament(N_ITERATIONS, REWARD_MATRIX, agents, seed=seed).play() for seed in seeds)
+        print(f"engines agree on {name} tournaments: {'ok' if same else 'MISMATCH'}")
+        passed = passed and same
+    return passed
+
+
+# checks that runs and engines agree where they promise to, exiting with failure if any does not
+CHECKS = {
+    "resume": check_resume,
+    "engines": check_engines,
+}
+
+
+# run every check, or those named on the command line
+def main():
+    names = (sys.argv[1:] or list(CHECKS))
+    failed = [name for name in names if not CHECKS[name]()]
+    if failed:
+        print(f"failed: {', '.join(failed)}")
+        sys.exit(1)
+    return
+
+
+# run main function if called as program
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import argparse
+import json
+import os
+# other code developed for project
+from experiments import *
+from status import *
+
+
+# settings of an experiment, a config file only needs the ones that differ from these
+DEFAULT_CONFIG = {
+    # one of "arousal", "temperament", "disposition", "global", "sweep", or "evolution"
+    "experiment": "arousal",
+    # values of the varied parameter for single-parameter experiments, the usual ones if None
+    "values": None,
+    # number of agents in the global experiment
+    "n_agents": 200,
+    # points tested by the sweep experiment and starting types of the evolution experiment
+    "sweep": {"axes": {"a": [0.5, 5], "b": [0.5, 5], "e": [-0.8, 0.8]}, "method": "lhs", "n_points": 50, "decimals": 2},
+    # population and dynamics of the evolution experiment
+    "evolution": {"n_individuals": 10000, "n_generations": 1000, "method": "replicator", "mutation_rate": 0.001, "mutation_scale": 0.1},
+    "n_iterations": 200,
+    "reward_matrix": [0, 1, 3, 5],
+    "n_trials": 100,
+    "n_err": 10,
+    # stop once every agent's confidence interval is narrower than this rather than playing all tournaments
+    "ci_width": None,
+    # tournaments are spread over this many processes (all cores if None)
+    "n_workers": None,
+    # drawn at random if None, the seed actually used is saved with the results
+    "seed": None,
+    "checkpoint_every": 10,
+    "progress": True,
+    # directory results, the config they came from, and the checkpoint of an unfinished run are written to
+    "output": "results",
+    # progress, running means, and confidence intervals of tournament experiments are written to this JSON file in the
+    # output directory and served as JSON on this local port while running, if set
+    "status_file": None,
+    "status_port": None,
+}
+# varied parameter of each single-parameter experiment and the function building its agents
+PARAMETER_EXPERIMENTS = {
+    "arousal": ("a", arousal_experiment),
+    "temperament": ("b", temperament_experiment),
+    "disposition": ("e", disposition_experiment),
+}
+EXPERIMENTS = tuple(PARAMETER_EXPERIMENTS) + ("global", "sweep", "evolution")
+# settings a tournament experiment's checkpoint must share with the config resuming it, as any other change to them would
+# mix tournaments of different experiments (the seed is checked on its own, since a config without one takes the saved one)
+CHECKPOINT_SETTINGS = ("experiment", "values", "n_agents", "n_iterations", "reward_matrix", "n_err", "n_trials", "ci_width")
+
+
+# read a JSON config file, filling in defaults for settings it does not give
+def load_config(path):
+    with open(path) as file:
+        config = json.load(file)
+    for key in config:
+        if key not in DEFAULT_CONFIG:
+            raise ValueError(f"Unknown config setting {key}")
+    if config.get("experiment", DEFAULT_CONFIG["experiment"]) not in EXPERIMENTS:
+        raise ValueError(f"Unknown experiment {config['experiment']}")
+    # nested settings are filled in one level down too
+    return {key: (dict(default, **config.get(key, {})) if isinstance(default, dict) else config.get(key, default)) for (key, default) in DEFAULT_CONFIG.items()}
+
+
+# write a file in one step so an interrupted run never leaves half of it behind
+def write_json(path, data):
+    with open(path + ".tmp", "w") as file:
+        json.dump(data, file, indent=4)
+    os.replace(path + ".tmp", path)
+    return
+
+
+# return the checkpoint file of the run saving to an output directory
+def get_checkpoint(output):
+    return os.path.join(output, "checkpoint.pkl")
+
+
+# table of average performance and its error for each agent, with the agent's parameters
+def get_agent_table(agents, averages, errs):
+    table = np.zeros(len(agents), dtype=[("a", float), ("b", float), ("e", float), ("mean", float), ("err", float)])
+    for (row, agent) in enumerate(agents):
+        for name in ("a", "b", "e"):
+            table[row][name] = agent.get_params()[name]
+    table["mean"] = averages
+    table["err"] = errs
+    return table
+
+
+# run the experiment of a config without displaying anything, reporting progress of tournaments to each output in status,
+# return arrays of results to save
+def run_config(config, metrics=None, status=()):
+    experiment = config["experiment"]
+    if experiment == "sweep":
+        sweep = Sweep(config["sweep"]["axes"], config["sweep"]["method"], config["sweep"]["n_points"], config["seed"], config["sweep"]["decimals"])
+        return {"table": run_sweep(sweep, config["n_iterations"], config["reward_matrix"], config["n_err"], config["n_trials"], config["seed"], config["n_workers"], metrics=metrics)}
+    if experiment == "evolution":
+        # generations play their games in this process without tournaments to time
+        if metrics is not None:
+            raise ValueError("Evolution experiments cannot be profiled")
+        settings = config["evolution"]
+        sweep = Sweep(config["sweep"]["axes"], config["sweep"]["method"], config["sweep"]["n_points"], config["seed"], config["sweep"]["decimals"])
+        agents = sweep.get_agents()
+        evolution = Evolution(agents, [settings["n_individuals"] // len(agents)] * len(agents), config["n_iterations"], config["reward_matrix"], settings["method"], mutation_rate=settings["mutation_rate"], mutation_scale=settings["mutation_scale"], seed=config["seed"])
+        return {"table": evolution.run(settings["n_generations"])}
+
+    # tournament experiments resume from their checkpoint if the run was stopped, as long as it came from the same settings
+    settings = {key: config[key] for key in CHECKPOINT_SETTINGS}
+    runner = ExperimentRunner(get_checkpoint(config["output"]), config["checkpoint_every"], config["seed"], config["progress"], status, settings)
+    config["seed"] = runner.get_seed()
+    if experiment == "global":
+        params, agents = global_experiment(runner.get_seed(), config["n_agents"])
+    else:
+        name, build = PARAMETER_EXPERIMENTS[experiment]
+        agents = Sweep({name: config["values"]}).get_agents() if config["values"] is not None else build()[1]
+    totals, averages, errs = run_trials(runner, config["n_iterations"], config["reward_matrix"], agents, config["n_err"], config["n_trials"], config["n_workers"], config["ci_width"], metrics)
+    return {"table": get_agent_table(agents, averages, errs), "totals": totals}
+
+
+# run the experiment of a config file and save its results and settings to the output directory, nothing is plotted
+def run_command(path, metrics=None):
+    config = load_config(path)
+    os.makedirs(config["output"], exist_ok=True)
+    # sampled experiments need their seed fixed before running so it can be saved with the results
+    if (config["seed"] is None) and (config["experiment"] in ("sweep", "evolution")):
+        config["seed"] = np.random.SeedSequence().entropy
+    status = []
+    try:
+        if config["status_file"] is not None:
+            status.append(StatusFile(os.path.join(config["output"], config["status_file"])))
+        if config["status_port"] is not None:
+            status.append(StatusServer(config["status_port"]))
+            print(f"Serving status at http://127.0.0.1:{status[-1].get_port()}/")
+        results = run_config(config, metrics, status)
+    finally:
+        for output in status:
+            output.close()
+    file_name = os.path.join(config["output"], "results.npz")
+    with open(file_name + ".tmp", "wb") as file:
+        np.savez(file, **results)
+    os.replace(file_name + ".tmp", file_name)
+    write_json(os.path.join(config["output"], "config.json"), config)
+    # a finished run is never resumed, so a later run in the same directory starts afresh
+    if os.path.exists(get_checkpoint(config["output"])):
+        os.remove(get_checkpoint(config["output"]))
+    return results
+
+
+# plot the saved results of a finished run into its output directory, showing each plot only if asked to
+def plot_command(output, dpi=300, show=False):
+    with open(os.path.join(output, "config.json")) as file:
+        config = json.load(file)
+    with np.load(os.path.join(output, "results.npz")) as results:
+        table = results["table"]
+    experiment = config["experiment"]
+    if experiment in PARAMETER_EXPERIMENTS:
+        name = PARAMETER_EXPERIMENTS[experiment][0]
+        plot_parameter(table[name], table["mean"], table["err"], name, os.path.join(output, f"{experiment}.png"), dpi, show)
+    elif experiment in ("global", "sweep"):
+        # sweeps record the spread of each point rather than its error
+        errs = (table["err"] if experiment == "global" else table["max"] - table["min"])
+        params = np.array([table["a"], table["b"], table["e"]])
+        plot_global(params, table["mean"], errs, [os.path.join(output, f"{experiment}_{name}.png") for name in ("arousal", "temperament", "disposition")], dpi, show)
+    else:
+        plot_evolution(table, os.path.join(output, "evolution.png"), dpi, show)
+    return
+
+
+# run an experiment headless from a config file, or plot the results of one that already ran
+def main():
+    parser = argparse.ArgumentParser(description="Run tournament experiments from config files and plot their saved results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the experiment of a JSON config file and save its results")
+    run_parser.add_argument("config", help="JSON file of settings that differ from the defaults")
+    run_parser.add_argument("--profile", action="store_true", help="time each phase of the tournaments and print a report at the end (not for evolution experiments)")
+    plot_parser = commands.add_parser("plot", help="plot the saved results of a run")
+    plot_parser.add_argument("output", help="output directory of the run")
+    plot_parser.add_argument("--dpi", type=int, default=300, help="resolution of saved plots")
+    plot_parser.add_argument("--show", action="store_true", help="also display each plot, which needs a display")
+    args = parser.parse_args()
+    if args.command == "run":
+        metrics = (Metrics() if args.profile else None)
+        run_command(args.config, metrics)
+        if metrics is not None:
+            print(metrics.report())
+    else:
+        plot_command(args.output, args.dpi, args.show)
+    return
+
+
+# run main function if called as program
+if __name__ == "__main__":
+    main()
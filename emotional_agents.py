@@ -2,7 +2,7 @@
 
 
 # basic built-in libraries required
-import numpy as np
+import math
 # code developed for basic utilities
 from agents import *
 
@@ -19,11 +19,44 @@ class PicardAgent(Agent):
         super().__init__(name)
         self.__a = params["a"]
         self.__b = params["b"]
+        self.__e = params["e"]
+        # noise and cognitive parameters are shared by all agents unless given for this one
+        self.__noise_param = params.get("noise_param")
+        self.__cognitive_param = params.get("cognitive_param")
+        return
+
+    # return the personality parameters of the agent
+    def get_params(self):
+        params = {"a": self.__a, "b": self.__b, "e": self.__e}
+        if self.__noise_param is not None:
+            params["noise_param"] = self.__noise_param
+        if self.__cognitive_param is not None:
+            params["cognitive_param"] = self.__cognitive_param
+        return params
+
+    # return how many rounds one flip occurs in on average for this agent
+    def get_noise_param(self):
+        return (self.__noise_param if self.__noise_param is not None else noise_param)
+
+    # return how strongly this agent's expectation follows the opponent's last decision
+    def get_cognitive_param(self):
+        return (self.__cognitive_param if self.__cognitive_param is not None else cognitive_param)
+
+    # mood and expectations start fresh for every game
+    def reset(self, position):
+        super().reset(position)
         # assume starting from neutral mood
         self.__c = 0
         # assume starting with no expectations at all
         self.__d = 0
-        self.__e = params["e"]
+        # only need to remember how many rounds were played and opponent's last decision
+        self.__n_rounds = 0
+        self.__last = 0
+        return
+
+    def observe(self, round):
+        self.__n_rounds += 1
+        self.__last = round.get_choices()[1 - self.get_position()].get_value()
         return
 
     def play(self):
@@ -37,19 +70,18 @@ class PicardAgent(Agent):
         # d is cognitive expectation: larger more positive
         # e is decision threshold: larger more positive
 
-        history = self.get_history()
         # input is last decision, or 0 if in first round
-        x = history[-1].get_choices()[1 - self.get_position()].get_value() if history else 0
+        x = self.__last if self.__n_rounds else 0
         # update cognitive expectation based on exponential deterioration and include new decision
         self.__d /= 2
-        self.__d += (history[-1].get_choices()[1 - self.get_position()].get_value() if len(history) >= 2 else 0) / cognitive_param
+        self.__d += (self.__last if self.__n_rounds >= 2 else 0) / self.get_cognitive_param()
         # directly apply model formula
-        y = 2 * self.__a / (1 + np.exp(-self.__b * (x + self.__c))) - self.__a - self.__d
+        y = 2 * self.__a / (1 + math.exp(-self.__b * (x + self.__c))) - self.__a - self.__d
         choice = (Choice.COOPERATE if y >= -self.__e else Choice.DEFECT)
         # print(f"Parameters:\n  x: {x}\n  a: {self.__a}\n  b: {self.__b}\n  c: {self.__c}\n  d: {self.__d}\n  e: {self.__e}\nResult:\n  y: {y}\n  choice: {choice}")
         # new mood is current emotion activation
         self.__c = y
         # sometimes random noise changes decision
-        if np.random.randint(noise_param) == 0:
+        if self.random() < 1 / self.get_noise_param():
             choice = (Choice.COOPERATE if choice == Choice.DEFECT else Choice.DEFECT)
         return choice
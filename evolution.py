@@ -0,0 +1,160 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+# other code developed for project
+from tournament import *
+from payoffs import *
+
+
+# range each personality parameter is kept in when it mutates, threshold is further kept within arousal
+BOUNDS = {"a": (0.5, 5), "b": (0.5, 5), "e": (-5, 5)}
+
+
+# population of Picard agents whose strategy types reproduce according to their payoffs against each other,
+# individuals of the same type are only counted, and each pair of types plays once rather than every pair of individuals
+class Evolution():
+    # set up population of the given agents with the given number of individuals of each, updated generation by generation
+    # either by the replicator dynamics ("replicator", offspring sampled in proportion to fitness) or by a Moran process
+    # ("moran", one birth and one death at a time), where offspring mutate a, b, and e with the given rate and scale
+    def __init__(self, agents, counts, n_iterations, reward_matrix, method="replicator", selection=1, mutation_rate=0.001, mutation_scale=0.1, decimals=2, n_samples=1, seed=None, chunk_size=4096):
+        if method not in ("replicator", "moran"):
+            raise ValueError(f"Unknown evolutionary method {method}")
+        self.__n_iterations = n_iterations
+        self.__reward_matrix = reward_matrix
+        self.__method = method
+        self.__selection = selection
+        self.__mutation_rate = mutation_rate
+        self.__mutation_scale = mutation_scale
+        # mutated parameters are rounded so nearby mutants share a type rather than each needing their own payoffs
+        self.__decimals = decimals
+        # dynamics and payoff games get separate random streams derived from this
+        self.__seed = (seed if seed is not None else np.random.SeedSequence())
+        self.__rng = np.random.default_rng(derive_seed(self.__seed, 0))
+        self.__generation = 0
+        # parameters and number of individuals of each type, with index of each type by its parameters
+        self.__types = []
+        self.__keys = {}
+        self.__counts = np.zeros(0, dtype=int)
+        # games between types, holding one agent per type in the same order as the types here, averaged over n_samples
+        self.__matrix = PayoffMatrix(n_iterations, reward_matrix, n_samples=n_samples, seed=derive_seed(self.__seed, 1), chunk_size=chunk_size)
+        # average payoff per round of each type (row) against each type (column)
+        self.__payoffs = np.zeros((0, 0))
+        indices = self.add_types([agent.get_params() for agent in agents])
+        np.add.at(self.__counts, np.array(indices, dtype=int), counts)
+        return
+
+    # return the number of generations played so far
+    def get_generation(self):
+        return self.__generation
+
+    # return the parameters and number of individuals of each type still alive
+    def get_population(self):
+        return self.__types, self.__counts
+
+    # return the average payoff per round of each type against each type
+    def get_payoffs(self):
+        return self.__payoffs
+
+    # add types with the given parameters if they are not already present, return index of each
+    def add_types(self, params_list):
+        new = []
+        indices = []
+        for params in params_list:
+            key = tuple(sorted(params.items()))
+            if key not in self.__keys:
+                self.__keys[key] = len(self.__types)
+                self.__types.append(params)
+                new.append(PicardAgent(str(key), params))
+            indices.append(self.__keys[key])
+        if new:
+            # only the new types are played, against every type already present and each other
+            self.__counts = np.concatenate((self.__counts, np.zeros(len(new), dtype=int)))
+            self.__matrix.add_agents(new)
+            self.__payoffs = self.__matrix.get_type_mean() / self.__n_iterations
+        return indices
+
+    # return average payoff per round of each type against a randomly chosen other member of the population
+    def get_expected_payoffs(self):
+        return (self.__payoffs @ self.__counts - np.diag(self.__payoffs)) / (self.__counts.sum() - 1)
+
+    # return parameters of a mutated copy of the given type, kept within bounds
+    def mutate(self, params):
+        params = dict(params)
+        for name in ("a", "b", "e"):
+            low, high = BOUNDS[name]
+            if name == "e":
+                low, high = max(low, -params["a"]), min(high, params["a"])
+            params[name] = float(np.clip(np.round(params[name] + self.__rng.normal(0, self.__mutation_scale), self.__decimals), low, high))
+        return params
+
+    # add one individual of a mutated type for each given parent type, return index of each new individual's type
+    def add_mutants(self, parents):
+        indices = self.add_types([self.mutate(self.__types[p]) for p in parents])
+        np.add.at(self.__counts, np.array(indices, dtype=int), 1)
+        return indices
+
+    # forget types with no individuals left so the payoff matrix only grows with the living population
+    def remove_extinct(self):
+        alive = (self.__counts > 0)
+        if np.all(alive):
+            return
+        self.__types = [params for (params, keep) in zip(self.__types, alive) if keep]
+        self.__keys = {tuple(sorted(params.items())): u for (u, params) in enumerate(self.__types)}
+        self.__counts = self.__counts[alive]
+        self.__matrix.remove_agents(np.flatnonzero(~alive))
+        self.__payoffs = self.__payoffs[np.ix_(alive, alive)]
+        return
+
+    # whole population is replaced by offspring drawn in proportion to each type's share times its fitness
+    def step_replicator(self):
+        weights = self.__counts * np.exp(self.__selection * self.get_expected_payoffs())
+        offspring = self.__rng.multinomial(self.__counts.sum(), weights / weights.sum())
+        mutants = self.__rng.binomial(offspring, self.__mutation_rate)
+        self.__counts = offspring - mutants
+        self.add_mutants(np.repeat(np.arange(len(mutants)), mutants))
+        return
+
+    # one individual chosen by fitness reproduces and one chosen uniformly dies, as many times as there are individuals
+    def step_moran(self):
+        n_individuals = self.__counts.sum()
+        payoffs = self.get_expected_payoffs()
+        for event in range(n_individuals):
+            weights = np.cumsum(self.__counts * np.exp(self.__selection * payoffs))
+            birth = min(np.searchsorted(weights, self.__rng.random() * weights[-1], side="right"), len(weights) - 1)
+            death = np.searchsorted(np.cumsum(self.__counts), self.__rng.integers(n_individuals), side="right")
+            if self.__rng.random() < self.__mutation_rate:
+                n_types = len(self.__types)
+                birth = self.add_types([self.mutate(self.__types[birth])])[0]
+                # payoffs of a new type are not covered by the update below
+                if len(self.__types) > n_types:
+                    payoffs = self.get_expected_payoffs()
+            # payoffs against the population only change by the individuals born and died
+            self.__counts[birth] += 1
+            self.__counts[death] -= 1
+            payoffs = payoffs + (self.__payoffs[:, birth] - self.__payoffs[:, death]) / (n_individuals - 1)
+        return
+
+    # play one generation
+    def step(self):
+        if self.__method == "replicator":
+            self.step_replicator()
+        else:
+            self.step_moran()
+        self.remove_extinct()
+        self.__generation += 1
+        return
+
+    # play the given number of generations, return table of population averages after each
+    def run(self, n_generations):
+        table = np.zeros(n_generations, dtype=[("generation", int), ("n_types", int), ("a", float), ("b", float), ("e", float), ("payoff", float)])
+        for g in range(n_generations):
+            self.step()
+            shares = self.__counts / self.__counts.sum()
+            table[g]["generation"] = self.__generation
+            table[g]["n_types"] = len(self.__types)
+            for name in ("a", "b", "e"):
+                table[g][name] = shares @ np.array([params[name] for params in self.__types])
+            table[g]["payoff"] = shares @ self.get_expected_payoffs()
+        return table
@@ -2,10 +2,15 @@
 
 
 # basic built-in libraries required
-from tqdm import tqdm
-import matplotlib.pyplot as plt
+import argparse
 # other code developed for project
 from tournament import *
+from batch import *
+from parallel import *
+from runner import *
+from sweep import *
+from evolution import *
+from plots import *
 
 
 # experiments to test arousal parameter
@@ -37,7 +42,7 @@ def arousal_experiment():
         4.75,
         5,
     ]
-    agents = [PicardAgent(f"Arousal={a:.1f}", {"a": a, "b": 1, "e": 0}) for a in a_vals]
+    agents = Sweep({"a": a_vals}).get_agents("Arousal={a:.1f}")
     return a_vals, agents
 
 
@@ -70,7 +75,7 @@ def temperament_experiment():
         4.75,
         5,
     ]
-    agents = [PicardAgent(f"Temperament={b:.1f}", {"a": 1, "b": b, "e": 0}) for b in b_vals]
+    agents = Sweep({"b": b_vals}).get_agents("Temperament={b:.1f}")
     return b_vals, agents
 
 
@@ -109,17 +114,58 @@ def disposition_experiment():
         0.9,
         1,
     ]
-    agents = [PicardAgent(f"Disposition={e:.1f}", {"a": 1, "b": 1, "e": e}) for e in e_vals]
+    agents = Sweep({"e": e_vals}).get_agents("Disposition={e:.1f}")
     return e_vals, agents
 
 
+# construct agents for large-scale tournaments, with every parameter drawn around a few typical values from the seed,
+# return parameters (one column per agent) and agents
+def global_experiment(seed, n_agents=200):
+    a_vals = [0.75, 1, 1.25, 1.5, 2, 3, 4.5]
+    b_vals = [0.75, 1, 1.25, 1.5, 2, 3, 4.5]
+    e_vals = [-0.8, -0.5, -0.25, -0.1, 0, 0.1, 0.25, 0.5, 0.8]
+    rng = np.random.default_rng(derive_seed(seed))
+    agents = []
+    params = np.zeros((3, n_agents))
+    for i in range(n_agents):
+        a = np.round(rng.choice(a_vals) + rng.normal(0, 0.1), 2)
+        b = np.round(rng.choice(b_vals) + rng.normal(0, 0.1), 2)
+        e = np.round((rng.choice(e_vals) + rng.normal(0, 0.1)) * a, 2)
+        assert (a > 0.5 and a < 5) and (b > 0.5 and b < 5) and (e > -a and e < a)
+        params[:,i] = [a, b, e]
+        agents.append(PicardAgent(f"a={a:.2f},b={b:.2f},e={e:.2f}", {"a": a, "b": b, "e": e}))
+    return params, agents
+
+
+# play the tournaments of an experiment, return totals of each of the n_err groups with average and error of each agent,
+# where error is either spread of the groups or, when stopping early at a confidence interval width, its half-width
+def run_trials(runner, n_iterations, reward_matrix, agents, n_err, n_trials, n_workers=None, ci_width=None, metrics=None):
+    if ci_width is None:
+        totals = runner.run(n_iterations, reward_matrix, agents, n_err, n_trials, n_workers, metrics=metrics)
+        averages = np.mean(totals, axis=0)
+        errs = np.max(totals, axis=0) - np.min(totals, axis=0)
+    else:
+        averages, errs = runner.run_adaptive(n_iterations, reward_matrix, agents, ci_width, max_trials=n_err * n_trials, n_workers=n_workers, metrics=metrics)
+        totals = averages[np.newaxis]
+    return totals, averages, errs
+
+
 # run experiment that isolates performance by parameter
-def run_parameter_experiment():
+def run_parameter_experiment(metrics=None):
     # set general experiment parameters
     n_iterations = 200
     reward_matrix = [0, 1, 3, 5]
     n_trials = 100
     n_err = 10
+    # tournaments are spread over this many processes (all cores if None), seeded for reproducibility
+    n_workers = None
+    seed = None
+    # progress is saved to this file every few tournaments so a killed run can resume from it
+    checkpoint = None
+    checkpoint_every = 10
+    runner = ExperimentRunner(checkpoint, checkpoint_every, seed)
+    # stop once every agent's confidence interval is narrower than this rather than playing all tournaments
+    ci_width = None
 
     # set experiment type to be carried out
     mode = "arousal"
@@ -135,24 +181,7 @@ def run_parameter_experiment():
         vals, agents = disposition_experiment()
 
     # run experiment
-    totals = np.zeros((n_err, len(agents)))
-    averages = np.zeros(len(agents))
-    maxs = np.zeros(len(agents))
-    mins = np.zeros(len(agents)) + reward_matrix[-1] * n_iterations
-    for k in tqdm(range(n_err)):
-        for i in tqdm(range(n_trials)):
-            tournament = Tournament(
-                n_iterations,
-                reward_matrix,
-                agents,
-            )
-            totals[k] = totals[k] + np.array(tournament.play()) / (len(agents) + 1) / n_trials
-        averages = averages + totals[k] / n_err
-        for j in range(len(agents)):
-            if totals[k][j] > maxs[j]:
-                maxs[j] = totals[k][j]
-            if totals[k][j] < mins[j]:
-                mins[j] = totals[k][j]
+    totals, averages, errs = run_trials(runner, n_iterations, reward_matrix, agents, n_err, n_trials, n_workers, ci_width, metrics)
     # display and plot results
     print(totals)
     [print(f"${vals[i]}$ & ${averages[i]:.2f}$ \\\\") for i in range(len(vals))]
@@ -160,68 +189,33 @@ def run_parameter_experiment():
     combined.sort(key=(lambda x: -x[1]))
     n_rows = int(len(combined) / 3) + (1 if (len(combined) % 3) else 0)
     [print(f"$({combined[i%n_agents][0]}$) & ${combined[i%n_agents][1]:.2f}$ & $({combined[(i+n_rows)%n_agents][0]})$ & ${combined[(i+n_rows)%n_agents][1]:.2f}$ & $({combined[(i+2*n_rows)%n_agents][0]})$ & ${combined[(i+2*n_rows)%n_agents][1]:.2f}$ \\\\") for i in range(n_rows)]
-    errs = maxs - mins
-    plt.errorbar(vals, averages, yerr=errs, fmt="b--o", ecolor="black", capsize=3)
-    plt.ylabel("Average Agent Performance")
-    plt.xlim([np.min(vals), np.max(vals)])
-
-    # format results properly
-    if mode == "arousal":
-        plt.title("Average Agent Performance with Varying Arousal")
-        plt.xlabel("Agent Arousal, $a$")
-    elif mode == "temperament":
-        plt.title("Average Agent Performance with Varying Temperament")
-        plt.xlabel("Agent Temperament, $b$")
-    elif mode == "disposition":
-        plt.title("Average Agent Performance with Varying Disposition")
-        plt.xlabel("Agent Disposition, $e$")
-    plt.savefig("temp.png", dpi=1000)
-    plt.show()
+    plot_parameter(vals, averages, errs, {"arousal": "a", "temperament": "b", "disposition": "e"}[mode], "temp.png")
     return
 
 
 # run experiment to test all parameters
-def run_global_experiment():
+def run_global_experiment(metrics=None):
     # set general experiment parameters
     n_iterations = 200
     reward_matrix = [0, 1, 3, 5]
     n_trials = 100
     n_err = 10
+    # tournaments are spread over this many processes (all cores if None), seeded for reproducibility
+    n_workers = None
+    seed = None
+    # progress is saved to this file every few tournaments so a killed run can resume from it
+    checkpoint = None
+    checkpoint_every = 10
+    runner = ExperimentRunner(checkpoint, checkpoint_every, seed)
+    # stop once every agent's confidence interval is narrower than this rather than playing all tournaments
+    ci_width = None
 
-    # construct agents for large-scale tournaments
-    a_vals = [0.75, 1, 1.25, 1.5, 2, 3, 4.5]
-    b_vals = [0.75, 1, 1.25, 1.5, 2, 3, 4.5]
-    e_vals = [-0.8, -0.5, -0.25, -0.1, 0, 0.1, 0.25, 0.5, 0.8]
+    # construct agents for large-scale tournaments, drawn from the run's seed so a resumed run rebuilds the same ones
     n_agents = 200
-    agents = []
-    params = np.zeros((3, n_agents))
-    for i in range(n_agents):
-        a = np.round(np.random.choice(a_vals) + np.random.normal(0, 0.1), 2)
-        b = np.round(np.random.choice(b_vals) + np.random.normal(0, 0.1), 2)
-        e = np.round((np.random.choice(e_vals) + np.random.normal(0, 0.1)) * a, 2)
-        assert (a > 0.5 and a < 5) and (b > 0.5 and b < 5) and (e > -a and e < a)
-        params[:,i] = [a, b, e]
-        agents.append(PicardAgent(f"a={a:.2f},b={b:.2f},e={e:.2f}", {"a": a, "b": b, "e": e}))
+    params, agents = global_experiment(runner.get_seed(), n_agents)
 
     # run experiment
-    totals = np.zeros((n_err, len(agents)))
-    averages = np.zeros(len(agents))
-    maxs = np.zeros(len(agents))
-    mins = np.zeros(len(agents)) + reward_matrix[-1] * n_iterations
-    for k in tqdm(range(n_err)):
-        for i in tqdm(range(n_trials)):
-            tournament = Tournament(
-                n_iterations,
-                reward_matrix,
-                agents,
-            )
-            totals[k] = totals[k] + np.array(tournament.play()) / (len(agents) + 1) / n_trials
-        averages = averages + totals[k] / n_err
-        for j in range(len(agents)):
-            if totals[k][j] > maxs[j]:
-                maxs[j] = totals[k][j]
-            if totals[k][j] < mins[j]:
-                mins[j] = totals[k][j]
+    totals, averages, errs = run_trials(runner, n_iterations, reward_matrix, agents, n_err, n_trials, n_workers, ci_width, metrics)
 
     # display and plot results
     combined = [(agents[i], averages[i]) for i in range(len(agents))]
@@ -229,37 +223,63 @@ def run_global_experiment():
     n_rows = int(len(combined) / 3) + (1 if (len(combined) % 3) else 0)
     [print(f"$({combined[i%n_agents][0]}$) & ${combined[i%n_agents][1]:.2f}$ & $({combined[(i+n_rows)%n_agents][0]})$ & ${combined[(i+n_rows)%n_agents][1]:.2f}$ & $({combined[(i+2*n_rows)%n_agents][0]})$ & ${combined[(i+2*n_rows)%n_agents][1]:.2f}$ \\\\") for i in range(n_rows)]
     print(averages)
-    errs = maxs - mins
 
     # analyze results based on each parameter
-    plt.errorbar(params[0], averages, yerr=errs, fmt="bo", ecolor="black", capsize=3)
-    plt.title("Average Agent Performance with Varying Arousal")
-    plt.xlabel("Agent Arousal, $a$")
-    plt.ylabel("Average Agent Performance")
-    plt.xlim([0.5, 5])
-    plt.savefig("temp1.png", dpi=1000)
-    plt.show()
-    plt.errorbar(params[1], averages, yerr=errs, fmt="bo", ecolor="black", capsize=3)
-    plt.title("Average Agent Performance with Varying Temperament")
-    plt.xlabel("Agent Temperament, $b$")
-    plt.ylabel("Average Agent Performance")
-    plt.xlim([0.5, 5])
-    plt.savefig("temp2.png", dpi=1000)
-    plt.show()
-    plt.errorbar(params[2] / params[0], averages, yerr=errs, fmt="bo", ecolor="black", capsize=3)
-    plt.title("Average Agent Performance with Varying Disposition")
-    plt.xlabel("Agent Disposition, $e$")
-    plt.ylabel("Average Agent Performance")
-    plt.xlim([-1, 1])
-    plt.savefig("temp3.png", dpi=1000)
-    plt.show()
+    plot_global(params, averages, errs, ("temp1.png", "temp2.png", "temp3.png"))
+    return
+
+
+# run experiment over several parameters at once, sampled rather than hand-picked
+def run_sweep_experiment():
+    # set general experiment parameters
+    n_iterations = 200
+    reward_matrix = [0, 1, 3, 5]
+    n_trials = 100
+    n_err = 10
+    n_workers = None
+    seed = None
+
+    # spread agents evenly over the same ranges as the global experiment
+    sweep = Sweep({"a": (0.5, 5), "b": (0.5, 5), "e": (-0.8, 0.8)}, method="lhs", n_points=50, seed=seed, decimals=2)
+
+    # run experiment and display results
+    table = run_sweep(sweep, n_iterations, reward_matrix, n_err, n_trials, seed, n_workers)
+    table.sort(order="mean")
+    [print(f"${row['a']:.2f}$ & ${row['b']:.2f}$ & ${row['e']:.2f}$ & ${row['mean']:.2f}$ \\\\") for row in table[::-1]]
+    return
+
+
+# run experiment where personalities compete and mutate in a population over many generations
+def run_evolution_experiment():
+    # set general experiment parameters
+    n_iterations = 200
+    reward_matrix = [0, 1, 3, 5]
+    n_individuals = 10000
+    n_generations = 1000
+    seed = None
+
+    # population starts spread evenly over the same ranges as the global experiment, in equal numbers
+    sweep = Sweep({"a": (0.5, 5), "b": (0.5, 5), "e": (-0.8, 0.8)}, method="lhs", n_points=50, seed=seed, decimals=2)
+    agents = sweep.get_agents()
+    evolution = Evolution(agents, [n_individuals // len(agents)] * len(agents), n_iterations, reward_matrix, seed=seed)
+
+    # run experiment and plot how the average personality of the population changes
+    table = evolution.run(n_generations)
+    plot_evolution(table, "evolution.png")
     return
 
 
 # run the desired experiment
 def main():
-    # run_parameter_experiment()
-    run_global_experiment()
+    parser = argparse.ArgumentParser(description="Run tournaments of Picard agents and plot how parameters affect performance.")
+    parser.add_argument("--profile", action="store_true", help="time each phase of the tournaments and print a report at the end")
+    args = parser.parse_args()
+    # instrumentation is only switched on when asked for, uninstrumented runs pay nothing for it
+    metrics = (Metrics() if args.profile else None)
+    # run_parameter_experiment(metrics)
+    run_global_experiment(metrics)
+    if metrics is not None:
+        print(metrics.report())
     return
 
 
@@ -0,0 +1,50 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import math
+# compiled loops are only used when numba is installed, otherwise callers step games as numpy arrays instead
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# play whole games between two Picard agents one after another in plain scalar loops, the same update as PicardAgent.play,
+# writing each side's total score into totals and, if moves has a row per game, each round's choices into moves,
+# where parameters and totals have a row per side and a column per game, flips says when noise changes a decision,
+# and payoffs is indexed by (own choice, opponent choice) with 0 cooperating and 1 defecting
+def play_picard_games(a, b, e, cognitive, flips, payoffs, totals, moves):
+    n_games, n_iterations = flips.shape[0], flips.shape[1]
+    keep_moves = (moves.shape[0] > 0)
+    for m in range(n_games):
+        # mood, cognitive expectation, and input of each side, all neutral before the first round
+        c0, c1 = 0.0, 0.0
+        d0, d1 = 0.0, 0.0
+        x0, x1 = 0.0, 0.0
+        for t in range(n_iterations):
+            # expectation only includes last decision from the third round on
+            d0 /= 2
+            d1 /= 2
+            if t >= 2:
+                d0 += x0 / cognitive[0, m]
+                d1 += x1 / cognitive[1, m]
+            y0 = 2 * a[0, m] / (1 + math.exp(-b[0, m] * (x0 + c0))) - a[0, m] - d0
+            y1 = 2 * a[1, m] / (1 + math.exp(-b[1, m] * (x1 + c1))) - a[1, m] - d1
+            c0, c1 = y0, y1
+            # defect below threshold, then sometimes random noise changes decision
+            choice0 = (1 if y0 < -e[0, m] else 0) ^ (1 if flips[m, t, 0] else 0)
+            choice1 = (1 if y1 < -e[1, m] else 0) ^ (1 if flips[m, t, 1] else 0)
+            totals[0, m] += payoffs[choice0, choice1]
+            totals[1, m] += payoffs[choice1, choice0]
+            if keep_moves:
+                moves[m, t, 0] = choice0
+                moves[m, t, 1] = choice1
+            # input next round is opponent's last decision as +1 for cooperate and -1 for defect
+            x0 = 1.0 - 2 * choice1
+            x1 = 1.0 - 2 * choice0
+    return
+
+
+# compiled version of the loop above, or None when numba is not installed, compiled on first use and cached on disk
+compiled_play_picard_games = (numba.njit(cache=True, nogil=True)(play_picard_games) if numba is not None else None)
@@ -0,0 +1,131 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# timings and counts collected from tournaments when instrumentation is turned on, games run without any when it is off
+class Metrics():
+    # set up empty collection, the callback is optionally called with the class names and scores of every finished matchup
+    def __init__(self, callback=None):
+        self.__callback = callback
+        self.clear()
+        return
+
+    # forget everything collected so far
+    def clear(self):
+        # total seconds and number of times spent in each phase
+        self.__times = {}
+        self.__calls = {}
+        # number of decisions and total seconds spent deciding by each agent class
+        self.__decisions = {}
+        # number of matchups between each pair of agent classes, and of how they were resolved
+        self.__matchups = {}
+        self.__counts = {}
+        return
+
+    # the callback is not sent to worker processes, only the collected values
+    def __getstate__(self):
+        return {key: value for (key, value) in self.__dict__.items() if key != "_Metrics__callback"}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__callback = None
+        return
+
+    # return total seconds spent in each phase
+    def get_times(self):
+        return self.__times
+
+    # return number of times each phase was entered
+    def get_calls(self):
+        return self.__calls
+
+    # return number of decisions and total seconds spent deciding by each agent class
+    def get_decisions(self):
+        return self.__decisions
+
+    # return number of matchups between each pair of agent classes
+    def get_matchups(self):
+        return self.__matchups
+
+    # return number of occurrences of each counted event
+    def get_counts(self):
+        return self.__counts
+
+    # add time spent in a phase, which may cover several calls at once
+    def add_time(self, phase, seconds, n_calls=1):
+        self.__times[phase] = self.__times.get(phase, 0) + seconds
+        self.__calls[phase] = self.__calls.get(phase, 0) + n_calls
+        return
+
+    # time the enclosed block as a phase, only used around whole matchups or tournaments rather than single rounds
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        yield
+        self.add_time(phase, time.perf_counter() - start)
+        return
+
+    # add decisions made by an agent class and the time they took
+    def add_decisions(self, agent_type, n_decisions, seconds):
+        n, total = self.__decisions.get(agent_type, (0, 0))
+        self.__decisions[agent_type] = (n + n_decisions, total + seconds)
+        return
+
+    # count an event, such as a matchup being played or found in the cache
+    def add_count(self, event, n=1):
+        self.__counts[event] = self.__counts.get(event, 0) + n
+        return
+
+    # count a finished matchup between agents of the given classes
+    def add_matchup(self, type_a, type_b, scores):
+        self.__matchups[(type_a, type_b)] = self.__matchups.get((type_a, type_b), 0) + 1
+        if self.__callback is not None:
+            self.__callback(type_a, type_b, scores)
+        return
+
+    # add everything collected by another instance, such as one returned by a worker process
+    def merge(self, other):
+        for (phase, seconds) in other.get_times().items():
+            self.add_time(phase, seconds, other.get_calls()[phase])
+        for (agent_type, (n_decisions, seconds)) in other.get_decisions().items():
+            self.add_decisions(agent_type, n_decisions, seconds)
+        for (pair, n) in other.get_matchups().items():
+            self.__matchups[pair] = self.__matchups.get(pair, 0) + n
+        for (event, n) in other.get_counts().items():
+            self.add_count(event, n)
+        return
+
+    # return a printable summary of where time went
+    def report(self):
+        lines = []
+        # shares are of whole tournaments, phases summed over worker processes can add up to more than that
+        total = self.__times.get("tournament") or sum(self.__times.values())
+        lines.append(f"{'phase':<24} {'seconds':>10} {'share':>7} {'calls':>12}")
+        for (phase, seconds) in sorted(self.__times.items(), key=(lambda x: -x[1])):
+            lines.append(f"{phase:<24} {seconds:>10.3f} {(seconds / total if total else 0):>7.1%} {self.__calls[phase]:>12,}")
+        if self.__decisions:
+            lines.append("")
+            lines.append(f"{'agent class':<24} {'seconds':>10} {'decisions':>12} {'us each':>10}")
+            for (agent_type, (n_decisions, seconds)) in sorted(self.__decisions.items(), key=(lambda x: -x[1][1])):
+                lines.append(f"{agent_type:<24} {seconds:>10.3f} {n_decisions:>12,} {(1e6 * seconds / n_decisions if n_decisions else 0):>10.3f}")
+        if self.__counts:
+            lines.append("")
+            for (event, n) in sorted(self.__counts.items()):
+                lines.append(f"{event:<24} {n:>10,}")
+        if self.__matchups:
+            lines.append("")
+            lines.append(f"{'matchup':<48} {'count':>10}")
+            for ((type_a, type_b), n) in sorted(self.__matchups.items(), key=(lambda x: -x[1])):
+                lines.append(f"{type_a + ' vs. ' + type_b:<48} {n:>10,}")
+        return "\n".join(lines)
+
+
+# time the enclosed block as a phase of the given metrics, or do nothing when instrumentation is off
+def timer(metrics, phase):
+    if metrics is None:
+        return nullcontext()
+    return metrics.timer(phase)
@@ -0,0 +1,82 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import multiprocessing
+# other code developed for project
+from tournament import *
+from batch import *
+from population import *
+from shared import *
+
+
+# tournament setups shared by all tasks of this worker process, whether to instrument them, and the shared array their
+# scores are written to, set once when the worker starts
+worker_setups = None
+worker_profile = False
+worker_scores = None
+
+
+# store tournament setups in worker process so agents are only sent once rather than with every task
+def init_tournament_worker(setups, profile=False, scores=None):
+    global worker_setups, worker_profile, worker_scores
+    worker_setups = setups
+    worker_profile = profile
+    worker_scores = scores
+    return
+
+
+# play one whole tournament of a setup from its own seed so results do not depend on which worker runs it,
+# return its scores and, if profiling, what was measured while playing it
+def play_tournament(task):
+    s, seed = task
+    engine, n_iterations, reward_matrix, agents = worker_setups[s]
+    metrics = (Metrics() if worker_profile else None)
+    return engine(n_iterations, reward_matrix, agents, seed=seed, metrics=metrics).play(), metrics
+
+
+# play the t-th tournament of a batch in a worker process, writing its scores into row t of the shared array so only the
+# row number (and timings if profiling) are sent back
+def play_shared_tournament(task):
+    t, tournament_task = task
+    scores, metrics = play_tournament(tournament_task)
+    worker_scores.get_array()[t, :len(scores)] = scores
+    return t, metrics
+
+
+# play independent tournaments as one job, each task is the index of its (engine, n_iterations, reward_matrix, agents)
+# setup and its seed, yielding scores in task order and adding timings of every tournament to metrics if given
+def play_tournament_batch(setups, tasks, n_workers=None, metrics=None):
+    if n_workers == 1:
+        init_tournament_worker(setups, metrics is not None)
+        for (scores, tournament_metrics) in map(play_tournament, tasks):
+            if metrics is not None:
+                metrics.merge(tournament_metrics)
+            yield scores
+        return
+
+    # populations are placed in shared memory rather than copied into every worker
+    shared_setups = [(engine, n_iterations, reward_matrix, (agents.share() if isinstance(agents, Population) and (agents.get_path() is None) else agents)) for (engine, n_iterations, reward_matrix, agents) in setups]
+    # scores of every tournament have a preassigned row, exact integers unless some rewards are not
+    integer = all(np.issubdtype(np.asarray(reward_matrix).dtype, np.integer) for (engine, n_iterations, reward_matrix, agents) in setups)
+    with SharedArray((len(tasks), max(len(agents) for (engine, n_iterations, reward_matrix, agents) in setups)), (np.int64 if integer else np.float64)) as scores:
+        with multiprocessing.Pool(n_workers, initializer=init_tournament_worker, initargs=(shared_setups, metrics is not None, scores)) as pool:
+            try:
+                for (t, tournament_metrics) in pool.imap(play_shared_tournament, enumerate(tasks)):
+                    if metrics is not None:
+                        metrics.merge(tournament_metrics)
+                    yield scores.get_array()[t, :len(setups[tasks[t][0]][3])].tolist()
+            finally:
+                # shared populations are freed once the last reference to them is dropped
+                for (setup, shared_setup) in zip(setups, shared_setups):
+                    if shared_setup[3] is not setup[3]:
+                        shared_setup[3].get_shared().unlink()
+    return
+
+
+# play independent tournaments between the same agents, one per seed, yielding scores in seed order
+def play_tournaments(n_iterations, reward_matrix, agents, seeds, n_workers=None, engine=BatchTournament, metrics=None):
+    setups = [(engine, n_iterations, reward_matrix, agents)]
+    yield from play_tournament_batch(setups, [(0, seed) for seed in seeds], n_workers, metrics)
+    return
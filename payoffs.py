@@ -0,0 +1,170 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+# other code developed for project
+from tournament import *
+from batch import *
+
+
+# identify agents that always play alike, by their type and parameters
+def get_type_key(agent):
+    return (type(agent).__name__, tuple(sorted(agent.get_params().items())))
+
+
+# expected score of every agent against every agent, where agents with the same type and parameters share results and each
+# pair of types is played only once, so adding an agent plays at most its type against every type already present
+class PayoffMatrix():
+    # set up matrix of the given agents, averaging n_samples games of each pair of types that is not deterministic
+    def __init__(self, n_iterations, reward_matrix, agents=(), n_samples=1, seed=None, chunk_size=4096):
+        self.__n_iterations = n_iterations
+        self.__reward_matrix = reward_matrix
+        self.__n_samples = n_samples
+        # every batch of new games gets its own random streams derived from this
+        self.__seed = (seed if seed is not None else np.random.SeedSequence())
+        self.__chunk_size = chunk_size
+        self.__n_batches = 0
+        # agents in the order they were added, and index of the type of each
+        self.__agents = []
+        self.__types = np.zeros(0, dtype=int)
+        # one agent standing in for each type, with index of each type by its key, and number of agents of each type
+        self.__representatives = []
+        self.__keys = {}
+        self.__n_members = np.zeros(0, dtype=int)
+        # sum and sum of squares of scores of each type (row) against each type (column), and number of games summed
+        self.__sums = np.zeros((0, 0))
+        self.__squares = np.zeros((0, 0))
+        self.__n_games = np.zeros((0, 0), dtype=int)
+        self.add_agents(agents)
+        return
+
+    # return the number of agents in the matrix
+    def __len__(self):
+        return len(self.__agents)
+
+    # return the agents in the matrix
+    def get_agents(self):
+        return self.__agents
+
+    # return the index of the type of each agent
+    def get_types(self):
+        return self.__types
+
+    # return one agent of each type
+    def get_representatives(self):
+        return self.__representatives
+
+    # return the number of agents of each type
+    def get_n_members(self):
+        return self.__n_members
+
+    # return average score of each type against each type
+    def get_type_mean(self):
+        return self.__sums / self.__n_games
+
+    # return sample variance of score of each type against each type, exactly 0 for deterministic pairs,
+    # and unknown (nan) for other pairs played only once
+    def get_type_variance(self):
+        deterministic = np.array([agent.deterministic for agent in self.__representatives], dtype=bool)
+        variance = (self.__squares - self.__sums ** 2 / self.__n_games) / np.maximum(self.__n_games - 1, 1)
+        return np.where(self.__n_games > 1, variance, np.where(np.outer(deterministic, deterministic), 0, np.nan))
+
+    # return average score of each agent against each agent
+    def get_mean(self):
+        return self.get_type_mean()[np.ix_(self.__types, self.__types)]
+
+    # return sample variance of score of each agent against each agent
+    def get_variance(self):
+        return self.get_type_variance()[np.ix_(self.__types, self.__types)]
+
+    # return expected total score of each agent in a round robin, where each agent plays all others once and itself
+    def get_scores(self):
+        mean = self.get_type_mean()
+        # playing itself scores from both sides
+        return (mean @ self.__n_members + np.diag(mean))[self.__types]
+
+    # add agents, playing each new type against every type, return indices of the added agents
+    def add_agents(self, agents):
+        types = []
+        n_types = len(self.__representatives)
+        for agent in agents:
+            key = get_type_key(agent)
+            if key not in self.__keys:
+                self.__keys[key] = len(self.__representatives)
+                self.__representatives.append(agent)
+            types.append(self.__keys[key])
+        n_new = len(self.__representatives) - n_types
+        if n_new:
+            self.__n_members = np.concatenate((self.__n_members, np.zeros(n_new, dtype=int)))
+            self.__sums = np.pad(self.__sums, ((0, n_new), (0, n_new)))
+            self.__squares = np.pad(self.__squares, ((0, n_new), (0, n_new)))
+            self.__n_games = np.pad(self.__n_games, ((0, n_new), (0, n_new)))
+        types = np.array(types, dtype=int)
+        np.add.at(self.__n_members, types, 1)
+        first = len(self.__agents)
+        self.__agents.extend(agents)
+        self.__types = np.concatenate((self.__types, types))
+        if n_new:
+            self.play_types(np.arange(n_types, len(self.__representatives)))
+        return list(range(first, len(self.__agents)))
+
+    # remove agents at the given indices, forgetting types that no agent has any more, no games need to be played
+    def remove_agents(self, indices):
+        keep = np.ones(len(self.__agents), dtype=bool)
+        keep[indices] = False
+        np.subtract.at(self.__n_members, self.__types[~keep], 1)
+        self.__agents = [agent for (agent, kept) in zip(self.__agents, keep) if kept]
+        self.__types = self.__types[keep]
+        alive = (self.__n_members > 0)
+        if not np.all(alive):
+            # remaining types keep their order, so only their indices shift down
+            self.__types = (np.cumsum(alive) - 1)[self.__types]
+            self.__representatives = [agent for (agent, kept) in zip(self.__representatives, alive) if kept]
+            self.__keys = {get_type_key(agent): u for (u, agent) in enumerate(self.__representatives)}
+            self.__n_members = self.__n_members[alive]
+            self.__sums = self.__sums[np.ix_(alive, alive)]
+            self.__squares = self.__squares[np.ix_(alive, alive)]
+            self.__n_games = self.__n_games[np.ix_(alive, alive)]
+        return
+
+    # play the given new types, which are always the last ones, against every type including each other
+    def play_types(self, new):
+        # each new type plays every type before it and itself, so every pair is played once per sample
+        i = np.repeat(new, new + 1)
+        j = np.concatenate([np.arange(u + 1) for u in new])
+        deterministic = np.array([agent.deterministic for agent in self.__representatives], dtype=bool)
+        for s in range(self.__n_samples):
+            # deterministic pairs play the same way every time, so one game of them is enough
+            pairs = (np.ones(len(i), dtype=bool) if s == 0 else ~(deterministic[i] & deterministic[j]))
+            if not np.any(pairs):
+                break
+            scores = self.play_pairs(i[pairs], j[pairs], derive_seed(self.__seed, self.__n_batches, s))
+            for (rows, columns, side) in ((i[pairs], j[pairs], 0), (j[pairs], i[pairs], 1)):
+                np.add.at(self.__sums, (rows, columns), scores[side])
+                np.add.at(self.__squares, (rows, columns), scores[side] ** 2)
+                np.add.at(self.__n_games, (rows, columns), 1)
+        self.__n_batches += 1
+        return
+
+    # play one game between each pair of types i and j, seeded by its position in the list, return score of each side
+    def play_pairs(self, i, j, seed):
+        return play_pairs(self.__n_iterations, self.__reward_matrix, self.__representatives, i, j, seed, self.__chunk_size)
+
+
+# play one game between each pair of agents at indices i and j, the k-th seeded by k from the given seed, return score of
+# each side, exact integers unless some rewards are not
+def play_pairs(n_iterations, reward_matrix, agents, i, j, seed, chunk_size=4096):
+    scores = np.zeros((2, len(i)), dtype=np.asarray(reward_matrix).dtype)
+    # Picard agents and finite-state agents are stepped together as arrays, with the same results as playing them one
+    # game at a time
+    if can_batch(agents):
+        batch = BatchTournament(n_iterations, reward_matrix, agents, chunk_size, seed=seed)
+        params = batch.get_params()
+        for k in range(0, len(i), chunk_size):
+            scores[:, k:k + chunk_size] = batch.play_matchups(k, i[k:k + chunk_size], j[k:k + chunk_size], params)[0]
+    else:
+        tournament = Tournament(n_iterations, reward_matrix, agents, seed=seed)
+        for k in range(len(i)):
+            scores[:, k] = tournament.play_matchup(k, int(i[k]), int(j[k])).get_scores()
+    return scores
@@ -0,0 +1,143 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+# other code developed for project
+from tournament import *
+from payoffs import *
+
+
+# round robin that is kept between changes to its agents, every pair's game is stored so adding, removing, or replacing
+# agents only plays the games of the changed agents (one row of the round robin each) and updates the totals
+class PersistentTournament():
+    # set up tournament with IPD parameters and starting agents, optionally reusing results of deterministic games from a
+    # cache, where pairs are in the same positions as in Tournament, the agent with the lower index going first
+    def __init__(self, n_iterations, reward_matrix, agents=(), seed=None, cache=None, chunk_size=4096):
+        self.__n_iterations = n_iterations
+        self.__reward_matrix = reward_matrix
+        # every batch of new games gets its own random streams derived from this
+        self.__seed = (seed if seed is not None else np.random.SeedSequence())
+        self.__cache = cache
+        self.__chunk_size = chunk_size
+        self.__n_batches = 0
+        self.__n_played = 0
+        self.__agents = []
+        dtype = np.asarray(reward_matrix).dtype
+        # score of each agent (row) against each other agent (column), with each agent's game against itself kept apart
+        # as the total of both sides, and total score of each agent in the round robin
+        self.__pair_scores = np.zeros((0, 0), dtype=dtype)
+        self.__self_scores = np.zeros(0, dtype=dtype)
+        self.__scores = np.zeros(0, dtype=dtype)
+        self.add_agents(agents)
+        return
+
+    # return the number of agents in the tournament
+    def __len__(self):
+        return len(self.__agents)
+
+    # return the agents in the tournament
+    def get_agents(self):
+        return self.__agents
+
+    # return the total scores achieved by each agent across all its games
+    def get_scores(self):
+        return self.__scores.tolist()
+
+    # return score of each agent (row) against each agent (column), where an agent's score against itself is the average
+    # of both sides, as in Tournament.get_payoffs
+    def get_payoffs(self):
+        payoffs = self.__pair_scores.astype(float)
+        np.fill_diagonal(payoffs, self.__self_scores / 2)
+        return payoffs
+
+    # return the number of games played so far, not counting those found in the cache
+    def get_n_played(self):
+        return self.__n_played
+
+    # play one game between each pair of agents at indices i and j (i first), return score of each side
+    def play_pairs(self, i, j):
+        scores = np.zeros((2, len(i)), dtype=self.__scores.dtype)
+        pending = np.ones(len(i), dtype=bool)
+        # deterministic games played before are looked up rather than played again
+        if self.__cache is not None:
+            keys = [None] * len(i)
+            for k in range(len(i)):
+                agent_a, agent_b = self.__agents[i[k]], self.__agents[j[k]]
+                if agent_a.deterministic and agent_b.deterministic:
+                    keys[k] = self.__cache.get_key(agent_a, agent_b, self.__n_iterations, self.__reward_matrix)
+                    cached = self.__cache.get(keys[k])
+                    if cached is not None:
+                        scores[:, k] = cached
+                        pending[k] = False
+        if np.any(pending):
+            scores[:, pending] = play_pairs(self.__n_iterations, self.__reward_matrix, self.__agents, i[pending], j[pending], derive_seed(self.__seed, self.__n_batches), self.__chunk_size)
+            self.__n_batches += 1
+            self.__n_played += int(np.count_nonzero(pending))
+            if self.__cache is not None:
+                for k in np.flatnonzero(pending):
+                    if keys[k] is not None:
+                        self.__cache.put(keys[k], tuple(scores[:, k].tolist()))
+        return scores
+
+    # play every game of the agents at the given indices against every agent, including each other and themselves, and
+    # store the results, where their old games must already have been taken out of the totals
+    def play_rows(self, rows):
+        n_agents = len(self.__agents)
+        changed = np.zeros(n_agents, dtype=bool)
+        changed[rows] = True
+        # each changed agent plays every agent, games between two changed agents only once
+        i = np.repeat(rows, n_agents)
+        j = np.tile(np.arange(n_agents), len(rows))
+        once = ~changed[j] | (i <= j)
+        i, j = i[once], j[once]
+        first, second = np.minimum(i, j), np.maximum(i, j)
+        scores = self.play_pairs(first, second)
+        others = (first != second)
+        self.__pair_scores[first[others], second[others]] = scores[0, others]
+        self.__pair_scores[second[others], first[others]] = scores[1, others]
+        self.__self_scores[first[~others]] = scores[0, ~others] + scores[1, ~others]
+        # changed agents are totalled from scratch, others only gain their games against them
+        self.__scores[rows] = self.__pair_scores[rows].sum(axis=1) + self.__self_scores[rows]
+        self.__scores[~changed] += self.__pair_scores[np.ix_(~changed, changed)].sum(axis=1)
+        return
+
+    # take the games of the agents at the given indices out of every other agent's total
+    def remove_rows(self, rows):
+        removed = np.zeros(len(self.__agents), dtype=bool)
+        removed[rows] = True
+        self.__scores[~removed] -= self.__pair_scores[np.ix_(~removed, removed)].sum(axis=1)
+        return
+
+    # add agents at the end, playing only their games, return indices of the added agents
+    def add_agents(self, agents):
+        first = len(self.__agents)
+        self.__agents.extend(agents)
+        n_new = len(self.__agents) - first
+        if n_new == 0:
+            return []
+        self.__pair_scores = np.pad(self.__pair_scores, ((0, n_new), (0, n_new)))
+        self.__self_scores = np.pad(self.__self_scores, (0, n_new))
+        self.__scores = np.pad(self.__scores, (0, n_new))
+        self.play_rows(np.arange(first, len(self.__agents)))
+        return list(range(first, len(self.__agents)))
+
+    # remove agents at the given indices, no games need to be played, later agents move down to fill the gaps
+    def remove_agents(self, indices):
+        self.remove_rows(np.asarray(indices, dtype=int))
+        keep = np.ones(len(self.__agents), dtype=bool)
+        keep[indices] = False
+        self.__agents = [agent for (agent, kept) in zip(self.__agents, keep) if kept]
+        self.__pair_scores = self.__pair_scores[np.ix_(keep, keep)]
+        self.__self_scores = self.__self_scores[keep]
+        self.__scores = self.__scores[keep]
+        return
+
+    # put new agents in place of the agents at the given indices, playing only their games
+    def replace_agents(self, indices, agents):
+        rows = np.asarray(indices, dtype=int)
+        self.remove_rows(rows)
+        for (row, agent) in zip(rows, agents):
+            self.__agents[row] = agent
+        self.play_rows(rows)
+        return
@@ -0,0 +1,74 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+
+
+# title and axis label of each personality parameter
+PARAMETER_LABELS = {
+    "a": ("Arousal", "Agent Arousal, $a$"),
+    "b": ("Temperament", "Agent Temperament, $b$"),
+    "e": ("Disposition", "Agent Disposition, $e$"),
+}
+
+
+# matplotlib is only imported once something is plotted, so runs that never plot (and worker processes) do not load it,
+# and it draws without a display unless the plot is to be shown
+def get_pyplot(show=False):
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# save the current figure if a file is given, then show or discard it
+def finish_plot(plt, file_name=None, dpi=1000, show=True):
+    if file_name is not None:
+        plt.savefig(file_name, dpi=dpi)
+    if show:
+        plt.show()
+    plt.close()
+    return
+
+
+# plot average performance against the values of the one parameter that was varied
+def plot_parameter(vals, averages, errs, name, file_name=None, dpi=1000, show=True):
+    plt = get_pyplot(show)
+    title, label = PARAMETER_LABELS[name]
+    plt.errorbar(vals, averages, yerr=errs, fmt="b--o", ecolor="black", capsize=3)
+    plt.title(f"Average Agent Performance with Varying {title}")
+    plt.xlabel(label)
+    plt.ylabel("Average Agent Performance")
+    plt.xlim([np.min(vals), np.max(vals)])
+    finish_plot(plt, file_name, dpi, show)
+    return
+
+
+# plot average performance of agents with every parameter varied against each parameter in turn, one file per parameter,
+# where disposition is shown relative to arousal
+def plot_global(params, averages, errs, file_names=(None, None, None), dpi=1000, show=True):
+    plt = get_pyplot(show)
+    for (i, name) in enumerate(("a", "b", "e")):
+        title, label = PARAMETER_LABELS[name]
+        plt.errorbar((params[2] / params[0] if name == "e" else params[i]), averages, yerr=errs, fmt="bo", ecolor="black", capsize=3)
+        plt.title(f"Average Agent Performance with Varying {title}")
+        plt.xlabel(label)
+        plt.ylabel("Average Agent Performance")
+        plt.xlim([-1, 1] if name == "e" else [0.5, 5])
+        finish_plot(plt, file_names[i], dpi, show)
+    return
+
+
+# plot how the average personality of an evolving population changes over generations
+def plot_evolution(table, file_name=None, dpi=1000, show=True):
+    plt = get_pyplot(show)
+    for name in ("a", "b", "e"):
+        plt.plot(table["generation"], table[name], label=name)
+    plt.title("Average Personality of Evolving Population")
+    plt.xlabel("Generation")
+    plt.ylabel("Population Average")
+    plt.legend()
+    finish_plot(plt, file_name, dpi, show)
+    return
@@ -0,0 +1,207 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import json
+import os
+# other code developed for project
+from agents import *
+from rational_agents import *
+from emotional_agents import *
+import emotional_agents
+from strategies import *
+from shared import *
+
+
+# version of the population file format, saved alongside every population so old files can be recognized
+FORMAT_VERSION = 1
+# one row per agent, parameters not used by an agent's type are nan, and environment parameters of 0 mean the module value
+POPULATION_DTYPE = np.dtype([
+    ("type", np.uint8),
+    ("a", np.float64),
+    ("b", np.float64),
+    ("e", np.float64),
+    ("noise_param", np.int32),
+    ("cognitive_param", np.int32),
+])
+# fields that are passed to an agent as parameters, environment ones only when set
+AGENT_FIELDS = ("a", "b", "e")
+ENVIRONMENT_FIELDS = ("noise_param", "cognitive_param")
+
+
+# agent classes by type id, and whether each takes parameters, new types go at the end so saved ids keep their meaning
+AGENT_TYPES = []
+
+
+# add an agent class to the registry, return its type id
+def register_agent_type(agent_type, has_params=False):
+    for (type_id, (registered, registered_params)) in enumerate(AGENT_TYPES):
+        if registered is agent_type:
+            return type_id
+    AGENT_TYPES.append((agent_type, has_params))
+    return len(AGENT_TYPES) - 1
+
+
+# return the type id of an agent class
+def get_type_id(agent_type):
+    for (type_id, (registered, has_params)) in enumerate(AGENT_TYPES):
+        if registered is agent_type:
+            return type_id
+    raise KeyError(f"Agent type {agent_type.__name__} is not registered")
+
+
+# built-in agent types
+register_agent_type(PicardAgent, has_params=True)
+register_agent_type(NiceAgent)
+register_agent_type(NastyAgent)
+register_agent_type(RandomAgent)
+register_agent_type(TitForTatAgent)
+register_agent_type(TitForTwoTatsAgent)
+register_agent_type(GrudgerAgent)
+register_agent_type(DetectiveAgent)
+
+
+# table of agents that behaves like a list of them, agents are only built when accessed, and a population loaded from a
+# file or placed in shared memory is sent to worker processes as the file's path or the memory's name rather than its contents
+class Population():
+    # set up population from its table, optionally naming agents with a format string over their fields
+    def __init__(self, table, name=None, path=None, shared=None):
+        self.__table = table
+        self.__name = name
+        self.__path = path
+        self.__shared = shared
+        return
+
+    # file-backed populations are reopened from the file and shared ones attached to by whoever unpickles them
+    def __getstate__(self):
+        if self.__path is not None:
+            return {"name": self.__name, "path": self.__path}
+        if self.__shared is not None:
+            return {"name": self.__name, "shared": self.__shared}
+        return {"name": self.__name, "table": self.__table}
+
+    def __setstate__(self, state):
+        self.__name = state["name"]
+        self.__path = state.get("path")
+        self.__shared = state.get("shared")
+        if self.__path is not None:
+            self.__table = load_population(self.__path).get_table()
+        elif self.__shared is not None:
+            self.__table = self.__shared.get_array()
+        else:
+            self.__table = state["table"]
+        return
+
+    # return the number of agents in the population
+    def __len__(self):
+        return len(self.__table)
+
+    # return the agent at an index, or a population of a slice of agents
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Population(self.__table[index], self.__name)
+        return self.get_agent(index)
+
+    # build agents one at a time
+    def __iter__(self):
+        for i in range(len(self.__table)):
+            yield self.get_agent(i)
+
+    # return the table of agents
+    def get_table(self):
+        return self.__table
+
+    # return the file the population was loaded from, if any
+    def get_path(self):
+        return self.__path
+
+    # return the shared memory holding the table, if any
+    def get_shared(self):
+        return self.__shared
+
+    # return a copy of the population in shared memory, which the caller closes once no process needs it any more
+    def share(self):
+        shared = SharedArray(self.__table.shape, POPULATION_DTYPE)
+        shared.get_array()[:] = self.__table
+        return Population(shared.get_array(), self.__name, shared=shared)
+
+    # build the agent at an index from its row
+    def get_agent(self, i):
+        row = self.__table[i]
+        agent_type, has_params = AGENT_TYPES[row["type"]]
+        name = (self.__name.format(**{field: row[field] for field in POPULATION_DTYPE.names}) if self.__name is not None else agent_type.__name__)
+        if not has_params:
+            return agent_type(name)
+        params = {field: float(row[field]) for field in AGENT_FIELDS}
+        for field in ENVIRONMENT_FIELDS:
+            if row[field]:
+                params[field] = int(row[field])
+        return agent_type(name, params)
+
+    # return arrays of every parameter used by the batch engine, indexed like the agents, with Picard parameters filled in
+    # from module values where not set, and agents of other types playing their class's strategy table
+    def get_params(self):
+        types = self.__table["type"]
+        picard = (types == get_type_id(PicardAgent))
+        present = np.unique(types[~picard])
+        tables = [STRATEGY_TABLES.get(AGENT_TYPES[t][0]) for t in present]
+        if any(table is None for table in tables):
+            raise TypeError("Batch tournament can only play Picard agents and agents with strategy tables")
+        table_ids = np.full(len(AGENT_TYPES), -1)
+        table_ids[present] = np.arange(len(present))
+        params = {field: np.where(picard, self.__table[field], PLACEHOLDER_PARAMS[field]).astype(float) for field in AGENT_FIELDS}
+        params["noise_param"] = np.where(self.__table["noise_param"] != 0, self.__table["noise_param"], emotional_agents.noise_param)
+        params["cognitive_param"] = np.where(self.__table["cognitive_param"] != 0, self.__table["cognitive_param"], emotional_agents.cognitive_param)
+        params.update(get_table_params(table_ids[types], tables))
+        return params
+
+    # write the population to a .npy file that can be memory-mapped, with its format version and type names beside it
+    def save(self, path):
+        # written through a file object so numpy does not add its own extension to the path
+        with open(path, "wb") as file:
+            np.save(file, np.asarray(self.__table))
+        with open(path + ".json.tmp", "w") as file:
+            json.dump({"version": FORMAT_VERSION, "types": [agent_type.__name__ for (agent_type, has_params) in AGENT_TYPES]}, file)
+        os.replace(path + ".json.tmp", path + ".json")
+        return
+
+
+# build the table of a list of agent objects
+def get_population(agents, name=None):
+    table = np.zeros(len(agents), dtype=POPULATION_DTYPE)
+    for (i, agent) in enumerate(agents):
+        table[i]["type"] = get_type_id(type(agent))
+        params = agent.get_params()
+        for field in AGENT_FIELDS:
+            table[i][field] = params.get(field, np.nan)
+        for field in ENVIRONMENT_FIELDS:
+            table[i][field] = params.get(field, 0)
+    return Population(table, name)
+
+
+# build a population of Picard agents straight from arrays of their parameters, without creating any agent objects
+def get_picard_population(a, b, e, noise_param=0, cognitive_param=0, name=None):
+    table = np.zeros(len(a), dtype=POPULATION_DTYPE)
+    table["type"] = get_type_id(PicardAgent)
+    table["a"], table["b"], table["e"] = a, b, e
+    table["noise_param"], table["cognitive_param"] = noise_param, cognitive_param
+    return Population(table, name)
+
+
+# read a population saved by Population.save, memory-mapped unless mmap is False, translating type ids saved under
+# a different registry to the current one
+def load_population(path, mmap=True, name=None):
+    with open(path + ".json") as file:
+        header = json.load(file)
+    if header["version"] > FORMAT_VERSION:
+        raise ValueError(f"Population file version {header['version']} is newer than supported version {FORMAT_VERSION}")
+    table = np.load(path, mmap_mode=("r" if mmap else None))
+    if table.dtype != POPULATION_DTYPE:
+        raise ValueError("Population file does not have the expected fields")
+    names = [agent_type.__name__ for (agent_type, has_params) in AGENT_TYPES]
+    ids = np.array([names.index(saved) for saved in header["types"]], dtype=np.uint8)
+    if np.any(ids != np.arange(len(ids))):
+        table = np.array(table)
+        table["type"] = ids[table["type"]]
+    return Population(table, name, path)
@@ -1,8 +1,6 @@
 # Isaac Joffe (2024)
 
 
-# basic built-in libraries required
-import numpy as np
 # code developed for basic utilities
 from agents import *
 
@@ -10,73 +8,149 @@ from agents import *
 # agent that randomly decides to cooperate or defect each round
 class RandomAgent(Agent):
     def play(self):
-        return Choice(np.random.randint(2))
+        return (Choice.DEFECT if self.random() < 0.5 else Choice.COOPERATE)
 
 
 # agent that always cooperates
 class NiceAgent(Agent):
+    deterministic = True
+
+    # decision never changes
+    def get_state(self):
+        return ()
+
     def play(self):
         return Choice.COOPERATE
 
 
 # agent that always defects
 class NastyAgent(Agent):
+    deterministic = True
+
+    # decision never changes
+    def get_state(self):
+        return ()
+
     def play(self):
         return Choice.DEFECT
 
 
 # agent that follows lead of other agent
 class TitForTatAgent(Agent):
+    deterministic = True
+
+    # only need to remember opponent's last move
+    def reset(self, position):
+        super().reset(position)
+        self.__last = None
+        return
+
+    def observe(self, round):
+        self.__last = round.get_choices()[1 - self.get_position()]
+        return
+
+    # decision depends only on opponent's last move
+    def get_state(self):
+        return self.__last
+
     def play(self):
-        history = self.get_history()
-        if history:
+        if self.__last is not None:
             # if not in first round, copy whatever opponent did last round (other position)
-            return history[-1].get_choices()[1 - self.get_position()]
+            return self.__last
         # start by cooperating
         return Choice.COOPERATE
 
 
 # agent that follows lead of other agent, but nicer (from https://ncase.me/trust/)
 class TitForTwoTatsAgent(Agent):
+    deterministic = True
+
+    # only need to remember opponent's last two moves, oldest first
+    def reset(self, position):
+        super().reset(position)
+        self.__last = ()
+        return
+
+    def observe(self, round):
+        self.__last = self.__last[-1:] + (round.get_choices()[1 - self.get_position()],)
+        return
+
+    # decision depends only on opponent's last two moves
+    def get_state(self):
+        return self.__last
+
     def play(self):
-        history = self.get_history()
-        if (history) and (len(history) > 1):
-            # if not in first two rounds, defect only if opponent has defected twice in a row
-            if (history[-2].get_choices()[1 - self.get_position()] == Choice.DEFECT) and (history[-1].get_choices()[1 - self.get_position()] == Choice.DEFECT):
-                return Choice.DEFECT
+        # if not in first two rounds, defect only if opponent has defected twice in a row
+        if self.__last == (Choice.DEFECT, Choice.DEFECT):
+            return Choice.DEFECT
         # start by cooperating
         return Choice.COOPERATE
 
 
 # agent that cooperates until the other defects, then always defects (from https://ncase.me/trust/)
 class GrudgerAgent(Agent):
+    deterministic = True
+
+    # only need to remember whether opponent has ever defected
+    def reset(self, position):
+        super().reset(position)
+        self.__grudge = False
+        return
+
+    def observe(self, round):
+        if round.get_choices()[1 - self.get_position()] == Choice.DEFECT:
+            self.__grudge = True
+        return
+
+    # decision depends only on whether opponent has ever defected
+    def get_state(self):
+        return self.__grudge
+
     def play(self):
-        history = self.get_history()
-        if history:
-            for round in history:
-                # defect if opponent has ever defected before
-                if (round.get_choices()[1 - self.get_position()] == Choice.DEFECT):
-                    return Choice.DEFECT
+        # defect if opponent has ever defected before
+        if self.__grudge:
+            return Choice.DEFECT
         # start by cooperating
         return Choice.COOPERATE
 
 
 # complex rule-based agent (from https://ncase.me/trust/)
 class DetectiveAgent(Agent):
+    deterministic = True
+
+    # only need to remember how many rounds were played, whether opponent ever cheated, and their last move
+    def reset(self, position):
+        super().reset(position)
+        self.__n_rounds = 0
+        self.__cheated = False
+        self.__last = None
+        return
+
+    def observe(self, round):
+        self.__n_rounds += 1
+        self.__last = round.get_choices()[1 - self.get_position()]
+        if self.__last == Choice.DEFECT:
+            self.__cheated = True
+        return
+
+    # decision depends on round while sending feelers, then on whether opponent has ever cheated and their last move
+    def get_state(self):
+        if self.__n_rounds < 4:
+            return (self.__n_rounds, self.__cheated)
+        return (4, self.__cheated, self.__last)
+
     def play(self):
-        history = self.get_history()
         # send out initial feeler to gauge other agent
-        if len(history) == 0:
+        if self.__n_rounds == 0:
             return Choice.COOPERATE
-        elif len(history) == 1:
+        elif self.__n_rounds == 1:
             return Choice.DEFECT
-        elif len(history) == 2:
+        elif self.__n_rounds == 2:
             return Choice.COOPERATE
-        elif len(history) == 3:
+        elif self.__n_rounds == 3:
             return Choice.COOPERATE
         # if they ever cheated, then play tit-for-tat
         else:
-            for round in history:
-                if (round.get_choices()[1 - self.get_position()] == Choice.DEFECT):
-                    return history[-1].get_choices()[1 - self.get_position()]
+            if self.__cheated:
+                return self.__last
             return Choice.DEFECT
@@ -0,0 +1,98 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import glob
+import os
+
+
+# writes a summary of each finished matchup to disk in append-only chunks, so nothing is kept in memory
+class MatchupWriter():
+    # set up writer for a directory of chunk files, optionally also storing every move of every game
+    def __init__(self, path, chunk_size=100000, keep_moves=False):
+        self.__path = path
+        self.__chunk_size = chunk_size
+        self.__keep_moves = keep_moves
+        os.makedirs(self.__path, exist_ok=True)
+        # continue after anything already written so earlier runs are never overwritten
+        chunks = sorted(glob.glob(os.path.join(self.__path, "matchups_*.npz")))
+        self.__n_chunks = len(chunks)
+        self.__tournament = (int(np.load(chunks[-1])["tournament"].max()) if chunks else -1)
+        self.clear()
+        return
+
+    # close writer at end of with block so buffered matchups are not lost
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    # return whether moves of each game should be passed to the writer
+    def keeps_moves(self):
+        return self.__keep_moves
+
+    # empty buffer of matchups not yet written
+    def clear(self):
+        self.__buffer = {"tournament": [], "agent_a": [], "agent_b": [], "score_a": [], "score_b": [], "moves": []}
+        return
+
+    # following matchups belong to a new tournament
+    def start_tournament(self):
+        self.__tournament += 1
+        return self.__tournament
+
+    # buffer the summary of a finished matchup between agents at indices i and j, with choices as 0/1 per round if kept
+    def write(self, i, j, scores, choices=None):
+        self.__buffer["tournament"].append(self.__tournament)
+        self.__buffer["agent_a"].append(i)
+        self.__buffer["agent_b"].append(j)
+        self.__buffer["score_a"].append(scores[0])
+        self.__buffer["score_b"].append(scores[1])
+        if self.__keep_moves:
+            # eight choices per byte, games whose moves are not known (such as cached ones) are left empty
+            self.__buffer["moves"].append(np.packbits(np.asarray(choices, dtype=np.uint8)) if choices is not None else np.zeros(0, dtype=np.uint8))
+        if len(self.__buffer["tournament"]) >= self.__chunk_size:
+            self.flush()
+        return
+
+    # write buffered matchups to a new chunk file, replacing it in one step so a partial chunk is never seen
+    def flush(self):
+        if not self.__buffer["tournament"]:
+            return
+        chunk = {key: np.array(self.__buffer[key]) for key in ("tournament", "agent_a", "agent_b", "score_a", "score_b")}
+        if self.__keep_moves:
+            # moves of all games in a chunk are stored back to back, game k starts at offsets[k]
+            chunk["offsets"] = np.cumsum([0] + [len(moves) for moves in self.__buffer["moves"]])
+            chunk["moves"] = np.concatenate(self.__buffer["moves"])
+        file_name = os.path.join(self.__path, f"matchups_{self.__n_chunks:06d}.npz")
+        with open(file_name + ".tmp", "wb") as file:
+            np.savez_compressed(file, **chunk)
+        os.replace(file_name + ".tmp", file_name)
+        self.__n_chunks += 1
+        self.clear()
+        return
+
+    # write anything still buffered
+    def close(self):
+        self.flush()
+        return
+
+
+# read written matchup summaries one chunk at a time, so results larger than memory can still be analyzed
+def read_matchups(path):
+    for file_name in sorted(glob.glob(os.path.join(path, "matchups_*.npz"))):
+        with np.load(file_name) as chunk:
+            yield {key: chunk[key] for key in chunk.files}
+    return
+
+
+# recover the choices of game k within a chunk as an array of shape (rounds, 2), 0 cooperates and 1 defects, or None if
+# its moves are not known (such as games taken from the cache), which unpacking would otherwise read as all cooperating
+def unpack_moves(chunk, k, n_rounds):
+    if chunk["offsets"][k] == chunk["offsets"][k + 1]:
+        return None
+    moves = chunk["moves"][chunk["offsets"][k]:chunk["offsets"][k + 1]]
+    return np.unpackbits(moves, count=2 * n_rounds).reshape(n_rounds, 2)
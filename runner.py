@@ -0,0 +1,184 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import asyncio
+import pickle
+import time
+import os
+# other code developed for project
+from tournament import *
+from parallel import *
+from stats import *
+
+
+# runs the n_err x n_trials tournaments of an experiment, saving progress so a killed run can pick up where it stopped
+class ExperimentRunner():
+    # set up runner with optional checkpoint file, resuming from it (and its seed) if it already exists, showing progress
+    # bars unless progress is False, and reporting the status of the run after every tournament to each output in status,
+    # where settings (if given) describe the experiment and are saved with the checkpoint so only the same one resumes it
+    def __init__(self, checkpoint=None, checkpoint_every=10, seed=None, progress=True, status=(), settings=None):
+        self.__checkpoint = checkpoint
+        self.__checkpoint_every = checkpoint_every
+        self.__seed = seed
+        self.__settings = settings
+        self.__progress = progress
+        self.__status = list(status)
+        self.__totals = None
+        self.__stats = None
+        self.__n_done = 0
+        if (self.__checkpoint is not None) and os.path.exists(self.__checkpoint):
+            self.load()
+        # each tournament is seeded from this and its (k, trial) position, so it is all the RNG state a run needs
+        if self.__seed is None:
+            self.__seed = np.random.SeedSequence().entropy
+        return
+
+    # return the seed of the run, which is the saved one when resuming
+    def get_seed(self):
+        return self.__seed
+
+    # return the number of tournaments already completed
+    def get_n_done(self):
+        return self.__n_done
+
+    # read progress of an interrupted run from the checkpoint file, which must come from the same seed and settings if
+    # they were given
+    def load(self):
+        with open(self.__checkpoint, "rb") as file:
+            state = pickle.load(file)
+        if (self.__seed is not None) and (state["seed"] != self.__seed):
+            raise ValueError(f"Checkpoint {self.__checkpoint} was made with seed {state['seed']}, not {self.__seed}")
+        if (self.__settings is not None) and (state.get("settings") != self.__settings):
+            raise ValueError(f"Checkpoint {self.__checkpoint} was made by a different experiment")
+        self.__seed = state["seed"]
+        self.__totals = state["totals"]
+        self.__stats = state["stats"]
+        self.__n_done = state["n_done"]
+        return
+
+    # write progress to the checkpoint file, replacing it in one step so an interrupted save cannot corrupt it
+    def save(self):
+        if self.__checkpoint is None:
+            return
+        with open(self.__checkpoint + ".tmp", "wb") as file:
+            pickle.dump({"seed": self.__seed, "settings": self.__settings, "totals": self.__totals, "stats": self.__stats, "n_done": self.__n_done}, file)
+        os.replace(self.__checkpoint + ".tmp", self.__checkpoint)
+        return
+
+    # return progress of a run of n_total tournaments, with the running mean and confidence interval half-width of every
+    # agent's average score per game, where timing covers the tournaments played since this runner started n_start of them
+    def get_status(self, n_total, n_start, start_time, confidence=0.95):
+        elapsed = time.perf_counter() - start_time
+        per_second = ((self.__n_done - n_start) / elapsed if elapsed > 0 else 0.0)
+        half_width = self.__stats.get_half_width(confidence)
+        return {
+            "n_done": self.__n_done,
+            "n_total": n_total,
+            "elapsed": elapsed,
+            "per_second": per_second,
+            "remaining": ((n_total - self.__n_done) / per_second if per_second > 0 else float("inf")),
+            "mean": self.__stats.get_mean(),
+            "half_width": half_width,
+            "widest": 2 * float(np.max(half_width)),
+        }
+
+    # play one tournament per seed, yielding after each finishes the run's status with the tournament's average score per
+    # game of each agent under "scores", saving progress as it goes, closing the generator abandons tournaments not started,
+    # where accumulate (if given) is called with the index of each tournament within seeds and its scores before progress
+    # is saved, so anything it adds to the run's state is in every checkpoint counting that tournament
+    def stream_seeds(self, n_iterations, reward_matrix, agents, seeds, n_total, confidence=0.95, n_workers=None, engine=BatchTournament, metrics=None, accumulate=None):
+        if self.__stats is None:
+            self.__stats = RunningStats(len(agents))
+        elif len(self.__stats.get_mean()) != len(agents):
+            raise ValueError("Checkpoint does not match experiment being run")
+        n_start, start_time = self.__n_done, time.perf_counter()
+        results = play_tournaments(n_iterations, reward_matrix, agents, seeds, n_workers, engine, metrics)
+        try:
+            for (t, scores) in enumerate(results):
+                scores = np.array(scores) / (len(agents) + 1)
+                if accumulate is not None:
+                    accumulate(t, scores)
+                self.__stats.update(scores)
+                self.__n_done += 1
+                if self.__n_done % self.__checkpoint_every == 0:
+                    self.save()
+                status = self.get_status(n_total, n_start, start_time, confidence)
+                for output in self.__status:
+                    output.update(status)
+                yield dict(status, scores=scores)
+        finally:
+            results.close()
+            self.save()
+        return
+
+    # play tournaments of an open-ended run one at a time, up to max_trials, yielding the run's status after each with the
+    # tournament's own scores, so callers can watch the running mean and confidence interval and stop whenever they like
+    def stream(self, n_iterations, reward_matrix, agents, max_trials=1000, confidence=0.95, n_workers=None, engine=BatchTournament, metrics=None):
+        seeds = [derive_seed(self.__seed, i) for i in range(self.__n_done, max_trials)]
+        return self.stream_seeds(n_iterations, reward_matrix, agents, seeds, max_trials, confidence, n_workers, engine, metrics)
+
+    # same as stream, but as an async iterator that waits for each tournament in a worker thread, so an event loop can keep
+    # serving other tasks while the run goes on
+    async def stream_async(self, n_iterations, reward_matrix, agents, max_trials=1000, confidence=0.95, n_workers=None, engine=BatchTournament, metrics=None):
+        updates = self.stream(n_iterations, reward_matrix, agents, max_trials, confidence, n_workers, engine, metrics)
+        try:
+            while True:
+                update = await asyncio.to_thread(next, updates, None)
+                if update is None:
+                    break
+                yield update
+        finally:
+            updates.close()
+        return
+
+    # play all tournaments not yet completed, return average score per game of each agent for each of the n_err groups,
+    # timings of the tournaments are added to metrics if given
+    def run(self, n_iterations, reward_matrix, agents, n_err, n_trials, n_workers=None, engine=BatchTournament, metrics=None):
+        if self.__totals is None:
+            self.__totals = np.zeros((n_err, len(agents)))
+        elif self.__totals.shape != (n_err, len(agents)):
+            raise ValueError("Checkpoint does not match experiment being run")
+
+        # tournaments are completed in (k, trial) order, so resuming just skips those already done
+        positions = [(k, i) for k in range(n_err) for i in range(n_trials)][self.__n_done:]
+        seeds = [derive_seed(self.__seed, k, i) for (k, i) in positions]
+
+        # scores are added to their group before the tournament counts as done in a checkpoint
+        def accumulate(t, scores):
+            k = positions[t][0]
+            self.__totals[k] = self.__totals[k] + scores / n_trials
+            return
+
+        updates = self.stream_seeds(n_iterations, reward_matrix, agents, seeds, n_err * n_trials, n_workers=n_workers, engine=engine, metrics=metrics, accumulate=accumulate)
+        # only imported here so worker processes, which never show progress, do not load it
+        from tqdm import tqdm
+        with tqdm(initial=self.__n_done, total=n_err * n_trials, disable=(not self.__progress)) as progress:
+            for update in updates:
+                progress.update()
+        return self.__totals
+
+    # return whether every agent's confidence interval is narrower than the target width
+    def is_converged(self, ci_width, confidence=0.95, min_trials=10):
+        return (self.__n_done >= min_trials) and bool(np.all(2 * self.__stats.get_half_width(confidence) <= ci_width))
+
+    # play tournaments until every agent's confidence interval of average score per game is narrower than ci_width
+    # (or max_trials is reached), return mean and confidence interval half-width of each agent
+    def run_adaptive(self, n_iterations, reward_matrix, agents, ci_width, confidence=0.95, min_trials=10, max_trials=1000, n_workers=None, engine=BatchTournament, metrics=None):
+        if self.__stats is None:
+            self.__stats = RunningStats(len(agents))
+        elif len(self.__stats.get_mean()) != len(agents):
+            raise ValueError("Checkpoint does not match experiment being run")
+
+        if not self.is_converged(ci_width, confidence, min_trials):
+            # tournaments already queued when converging are abandoned, so at most a few per worker are wasted
+            updates = self.stream(n_iterations, reward_matrix, agents, max_trials, confidence, n_workers, engine, metrics)
+            from tqdm import tqdm
+            with tqdm(initial=self.__n_done, total=max_trials, disable=(not self.__progress)) as progress:
+                for update in updates:
+                    progress.update()
+                    if self.is_converged(ci_width, confidence, min_trials):
+                        break
+            updates.close()
+        return self.__stats.get_mean(), self.__stats.get_half_width(confidence)
@@ -0,0 +1,53 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+
+
+# numpy array in shared memory, sent to other processes by name so they write into the same memory rather than a copy
+class SharedArray():
+    # create a zeroed array of the given shape and type, or attach to an existing one by name
+    def __init__(self, shape, dtype, name=None):
+        self.__shape = tuple(shape)
+        self.__dtype = np.dtype(dtype)
+        # only the process that created the memory frees it
+        self.__owner = (name is None)
+        size = max(int(np.prod(self.__shape)) * self.__dtype.itemsize, 1)
+        self.__memory = SharedMemory(name=name, create=self.__owner, size=(size if self.__owner else 0))
+        self.__array = np.ndarray(self.__shape, self.__dtype, buffer=self.__memory.buf)
+        return
+
+    # only the name and layout are pickled, unpickling attaches to the same memory
+    def __getstate__(self):
+        return {"name": self.__memory.name, "shape": self.__shape, "dtype": self.__dtype}
+
+    def __setstate__(self, state):
+        self.__init__(state["shape"], state["dtype"], state["name"])
+        return
+
+    # free the memory once the creator is done with it
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        self.unlink()
+        return
+
+    # return the array backed by the shared memory
+    def get_array(self):
+        return self.__array
+
+    # detach from the memory, arrays returned before must no longer be used
+    def close(self):
+        self.__array = None
+        self.__memory.close()
+        return
+
+    # free the memory if this process created it, it stays usable by anyone still attached until they close it
+    def unlink(self):
+        if self.__owner:
+            self.__memory.unlink()
+        return
@@ -0,0 +1,210 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+# other code developed for project
+from tournament import *
+from batch import *
+from payoffs import *
+
+
+# undirected graph of agents stored in compressed sparse row form, neighbors of node i are indices[indptr[i]:indptr[i + 1]]
+class Graph():
+    # set up graph from the compressed rows of its symmetric adjacency matrix
+    def __init__(self, indptr, indices):
+        self.__indptr = np.asarray(indptr, dtype=np.int64)
+        self.__indices = np.asarray(indices, dtype=np.int64)
+        return
+
+    # return the number of nodes in the graph
+    def __len__(self):
+        return len(self.__indptr) - 1
+
+    # return the row pointers of the graph
+    def get_indptr(self):
+        return self.__indptr
+
+    # return the neighbors of every node, one row after another
+    def get_indices(self):
+        return self.__indices
+
+    # return the number of neighbors of each node
+    def get_degrees(self):
+        return np.diff(self.__indptr)
+
+    # return the neighbors of a single node
+    def get_neighbors(self, i):
+        return self.__indices[self.__indptr[i]:self.__indptr[i + 1]]
+
+    # return both ends of every edge once, lower index first
+    def get_edges(self):
+        i = np.repeat(np.arange(len(self)), self.get_degrees())
+        lower = (i < self.__indices)
+        return i[lower], self.__indices[lower]
+
+
+# build a graph of n nodes from the ends of its edges, dropping self loops and repeated edges
+def get_edge_graph(n, i, j):
+    i, j = np.asarray(i, dtype=np.int64), np.asarray(j, dtype=np.int64)
+    edges = np.unique(np.stack((np.minimum(i, j), np.maximum(i, j)), axis=1)[i != j], axis=0).reshape(-1, 2)
+    # every edge is stored in the rows of both of its ends
+    rows = np.concatenate((edges[:, 0], edges[:, 1]))
+    columns = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.lexsort((columns, rows))
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+    return Graph(indptr, columns[order])
+
+
+# build a graph from a list of the neighbors of each node
+def get_adjacency_graph(neighbors):
+    i = np.repeat(np.arange(len(neighbors)), [len(row) for row in neighbors])
+    j = np.array([neighbor for row in neighbors for neighbor in row], dtype=np.int64)
+    return get_edge_graph(len(neighbors), i, j)
+
+
+# build a grid where node y * width + x is linked to the 4 nodes beside it, or also the 4 diagonal ones if moore,
+# with edges wrapping around to the other side if periodic
+def get_lattice_graph(width, height, moore=False, periodic=True):
+    x, y = np.meshgrid(np.arange(width), np.arange(height))
+    x, y = x.ravel(), y.ravel()
+    # each edge is reached from one end only
+    offsets = [(1, 0), (0, 1)] + ([(1, 1), (1, -1)] if moore else [])
+    i, j = [], []
+    for (dx, dy) in offsets:
+        nx, ny = x + dx, y + dy
+        if periodic:
+            nx, ny = nx % width, ny % height
+            inside = np.ones(len(x), dtype=bool)
+        else:
+            inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+        i.append((y * width + x)[inside])
+        j.append((ny * width + nx)[inside])
+    return get_edge_graph(width * height, np.concatenate(i), np.concatenate(j))
+
+
+# build a Watts-Strogatz small world, a ring where each node is linked to the k nearest on each side and then each edge
+# has its far end moved to a random node with probability p (edges that would repeat or loop are dropped)
+def get_small_world_graph(n, k, p, seed=None):
+    rng = np.random.default_rng(seed)
+    i = np.repeat(np.arange(n), k)
+    j = (i + np.tile(np.arange(1, k + 1), n)) % n
+    rewired = (rng.random(len(j)) < p)
+    j[rewired] = rng.integers(n, size=np.count_nonzero(rewired))
+    return get_edge_graph(n, i, j)
+
+
+# represents a tournament where agents only play their neighbors on a graph, so its cost grows with the number of edges
+# rather than with the square of the number of agents, and agents may imitate better-scoring neighbors between rounds
+class NetworkTournament():
+    # set up tournament with IPD parameters, agents, and the graph whose node i is agent i
+    def __init__(self, n_iterations, reward_matrix, agents, graph, seed=None, chunk_size=4096):
+        if len(agents) != len(graph):
+            raise ValueError("Graph must have one node per agent")
+        self.__n_iterations = n_iterations
+        self.__reward_matrix = reward_matrix
+        self.__agents = list(agents)
+        self.__graph = graph
+        # every generation's games get their own random streams derived from this
+        self.__seed = (seed if seed is not None else np.random.SeedSequence())
+        self.__rng = np.random.default_rng(derive_seed(self.__seed))
+        self.__chunk_size = chunk_size
+        self.__edges = graph.get_edges()
+        # Picard agents and finite-state agents are stepped together as arrays, whose parameters are moved along with the
+        # agents when imitated
+        self.__params = None
+        if can_batch(self.__agents):
+            self.__params = BatchTournament(n_iterations, reward_matrix, self.__agents).get_params()
+        self.__generation = 0
+        self.__scores = np.zeros(len(self.__agents))
+        return
+
+    # return the agents currently at each node
+    def get_agents(self):
+        return self.__agents
+
+    # return the number of generations played so far
+    def get_generation(self):
+        return self.__generation
+
+    # return the total scores achieved by each agent against all its neighbors in the last round
+    def get_scores(self):
+        return self.__scores
+
+    # return the average score per game of each agent in the last round, 0 for agents without neighbors
+    def get_average_scores(self):
+        return self.__scores / np.maximum(self.__graph.get_degrees(), 1)
+
+    # play every edge once, in chunks of games stepped together if the batch engine can play all agents, return scores of each side
+    def play_edges(self, seed):
+        i, j = self.__edges
+        scores = np.zeros((2, len(i)))
+        if self.__params is not None:
+            batch = BatchTournament(self.__n_iterations, self.__reward_matrix, self.__agents, self.__chunk_size, seed=seed)
+            for k in range(0, len(i), self.__chunk_size):
+                scores[:, k:k + self.__chunk_size] = batch.play_matchups(k, i[k:k + self.__chunk_size], j[k:k + self.__chunk_size], self.__params)[0]
+        else:
+            tournament = Tournament(self.__n_iterations, self.__reward_matrix, self.__agents, seed=seed)
+            for k in range(len(i)):
+                scores[:, k] = tournament.play_matchup(k, int(i[k]), int(j[k])).get_scores()
+        return scores
+
+    # play one game along every edge of the graph, return total score of each agent
+    def play(self):
+        i, j = self.__edges
+        scores = self.play_edges(derive_seed(self.__seed, self.__generation))
+        self.__scores = np.bincount(i, scores[0], len(self.__agents)) + np.bincount(j, scores[1], len(self.__agents))
+        return self.__scores
+
+    # each agent copies the strategy of a neighbor based on average score per game of the last round, either the best
+    # neighbor if it did better ("best"), or a random neighbor with probability rising with how much better it did per round
+    # compared to the noise ("fermi")
+    def imitate(self, rule="best", noise=0.1):
+        indptr, indices = self.__graph.get_indptr(), self.__graph.get_indices()
+        degrees = self.__graph.get_degrees()
+        scores = self.get_average_scores()
+        has_neighbors = (degrees > 0)
+        source = np.arange(len(self.__agents))
+        if rule == "best":
+            # best score among each node's neighbors, and the first neighbor reaching it
+            values = scores[indices]
+            best = np.full(len(self.__agents), -np.inf)
+            best[has_neighbors] = np.maximum.reduceat(values, indptr[:-1][has_neighbors])
+            reaching = np.flatnonzero(values == np.repeat(best, degrees))
+            first = indices[reaching[np.searchsorted(reaching, indptr[:-1][has_neighbors])]]
+            better = has_neighbors.copy()
+            better[has_neighbors] = (best[has_neighbors] > scores[has_neighbors])
+            source[better] = first[better[has_neighbors]]
+        elif rule == "fermi":
+            choice = indptr[:-1] + (self.__rng.random(len(self.__agents)) * degrees).astype(np.int64)
+            neighbor = np.where(has_neighbors, indices[np.minimum(choice, len(indices) - 1)], source)
+            # logistic in the difference of scores per round, written with tanh so large differences cannot overflow
+            difference = (scores[neighbor] - scores) / self.__n_iterations
+            copy = (self.__rng.random(len(self.__agents)) < (1 + np.tanh(difference / (2 * noise))) / 2)
+            source[copy & has_neighbors] = neighbor[copy & has_neighbors]
+        else:
+            raise ValueError(f"Unknown imitation rule {rule}")
+        self.__agents = [self.__agents[s] for s in source]
+        if self.__params is not None:
+            self.__params = select_params(self.__params, source)
+        return source
+
+    # play one generation and let agents imitate their neighbors
+    def step(self, rule="best", noise=0.1):
+        self.play()
+        self.imitate(rule, noise)
+        self.__generation += 1
+        return
+
+    # play the given number of generations, return table of population averages after each, where personality
+    # averages are only filled in for populations of Picard agents
+    def run(self, n_generations, rule="best", noise=0.1):
+        table = np.zeros(n_generations, dtype=[("generation", int), ("n_types", int), ("payoff", float), ("a", float), ("b", float), ("e", float)])
+        for g in range(n_generations):
+            self.step(rule, noise)
+            table[g]["generation"] = self.__generation
+            table[g]["n_types"] = len(set(get_type_key(agent) for agent in self.__agents))
+            table[g]["payoff"] = np.mean(self.get_average_scores()) / self.__n_iterations
+            for name in ("a", "b", "e"):
+                table[g][name] = (np.mean(self.__params[name]) if (self.__params is not None) and np.all(self.__params["picard"]) else np.nan)
+        return table
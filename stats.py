@@ -0,0 +1,49 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+from statistics import NormalDist
+
+
+# running mean and variance of several quantities at once, updated one sample at a time (Welford's algorithm)
+class RunningStats():
+    # set up accumulator for the given number of quantities, nothing seen yet
+    def __init__(self, n_values):
+        self.__count = 0
+        self.__mean = np.zeros(n_values)
+        self.__m2 = np.zeros(n_values)
+        return
+
+    # include a new sample of every quantity
+    def update(self, values):
+        self.__count += 1
+        delta = values - self.__mean
+        self.__mean = self.__mean + delta / self.__count
+        # uses the updated mean, which keeps the sum of squared deviations numerically stable
+        self.__m2 = self.__m2 + delta * (values - self.__mean)
+        return
+
+    # return the number of samples seen
+    def get_count(self):
+        return self.__count
+
+    # return the sample mean of each quantity
+    def get_mean(self):
+        return self.__mean
+
+    # return the unbiased sample variance of each quantity
+    def get_variance(self):
+        if self.__count < 2:
+            return np.full(len(self.__mean), np.inf)
+        return self.__m2 / (self.__count - 1)
+
+    # return half the width of the normal-approximation confidence interval of each mean
+    def get_half_width(self, confidence=0.95):
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return z * np.sqrt(self.get_variance() / max(self.__count, 1))
+
+    # return lower and upper ends of the confidence interval of each mean
+    def get_interval(self, confidence=0.95):
+        half_width = self.get_half_width(confidence)
+        return self.__mean - half_width, self.__mean + half_width
@@ -0,0 +1,121 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import http.server
+import threading
+import json
+import time
+import os
+
+
+# return status with arrays as lists and values that JSON cannot hold (such as infinite widths before enough samples)
+# as None, so any JSON reader can parse it
+def get_json_status(status):
+    def convert(value):
+        if isinstance(value, np.ndarray):
+            return [convert(item) for item in value.tolist()]
+        if isinstance(value, (list, tuple)):
+            return [convert(item) for item in value]
+        if isinstance(value, float) and not np.isfinite(value):
+            return None
+        return value
+    return {key: convert(value) for (key, value) in status.items()}
+
+
+# writes the latest status of a run to a JSON file, at most once every few seconds so frequent updates cost little
+class StatusFile():
+    # set up writer for the given file, written at most every given number of seconds
+    def __init__(self, path, every=1.0):
+        self.__path = path
+        self.__every = every
+        self.__last = None
+        self.__written = 0
+        return
+
+    # close writer at end of with block so the final status is not lost
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    # keep the latest status, writing it if enough time has passed since the last write
+    def update(self, status):
+        self.__last = status
+        if time.perf_counter() - self.__written >= self.__every:
+            self.flush()
+        return
+
+    # write the latest status, replacing the file in one step so readers never see half of it
+    def flush(self):
+        if self.__last is None:
+            return
+        with open(self.__path + ".tmp", "w") as file:
+            json.dump(get_json_status(self.__last), file)
+        os.replace(self.__path + ".tmp", self.__path)
+        self.__written = time.perf_counter()
+        return
+
+    # write the final status
+    def close(self):
+        self.flush()
+        return
+
+
+# serves the latest status of a run as JSON over HTTP from a background thread, for watching a run from a browser or script
+class StatusServer():
+    # start serving on the given local port (any free one if 0)
+    def __init__(self, port=8000, host="127.0.0.1"):
+        self.__status = {}
+        server = self
+
+        # every GET request gets the latest status, whatever its path
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(get_json_status(server.get_status())).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            # requests are not logged to the terminal the run is reporting progress in
+            def log_message(self, *args):
+                return
+
+        self.__server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return
+
+    # stop serving at end of with block
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    # return the port being served on
+    def get_port(self):
+        return self.__server.server_address[1]
+
+    # return the latest status
+    def get_status(self):
+        return self.__status
+
+    # replace the status being served
+    def update(self, status):
+        self.__status = status
+        return
+
+    # stop serving
+    def close(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+        return
@@ -0,0 +1,167 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+# other code developed for project
+from agents import *
+from rational_agents import *
+
+
+# finite-state strategy where each state has a probability of defecting (exactly 0 or 1 in deterministic states) and a
+# state to move to after each round given (own choice, opponent choice), with play starting in state 0
+class StrategyTable():
+    # set up table from the defect probability of each state and its next states, indexed [state, own, opponent]
+    def __init__(self, defect, transitions):
+        self.__defect = np.asarray(defect, dtype=float)
+        self.__transitions = np.asarray(transitions, dtype=np.int16)
+        if self.__transitions.shape != (len(self.__defect), 2, 2):
+            raise ValueError("Strategy table needs next states for each state and pair of choices")
+        if np.any((self.__transitions < 0) | (self.__transitions >= len(self.__defect))):
+            raise ValueError("Strategy table moves to a state it does not have")
+        return
+
+    # return the number of states
+    def __len__(self):
+        return len(self.__defect)
+
+    # return the probability of defecting in each state
+    def get_defect(self):
+        return self.__defect
+
+    # return the next state after each pair of choices, indexed [state, own, opponent]
+    def get_transitions(self):
+        return self.__transitions
+
+    # return whether every state always makes the same decision
+    def is_deterministic(self):
+        return bool(np.all((self.__defect == 0) | (self.__defect == 1)))
+
+
+# build a table whose next state depends only on the opponent's choice, given as [state, opponent]
+def get_reactive_table(defect, transitions):
+    transitions = np.asarray(transitions)
+    return StrategyTable(defect, np.stack((transitions, transitions), axis=1))
+
+
+# tables of the rational agents, which play exactly as the classes do
+STRATEGY_TABLES = {
+    # one state that always cooperates, or always defects, or defects half the time
+    NiceAgent: get_reactive_table([0], [[0, 0]]),
+    NastyAgent: get_reactive_table([1], [[0, 0]]),
+    RandomAgent: get_reactive_table([0.5], [[0, 0]]),
+    # state is the opponent's last choice, starting as if they cooperated
+    TitForTatAgent: get_reactive_table([0, 1], [[0, 1], [0, 1]]),
+    # state counts the opponent's defections in a row, up to two
+    TitForTwoTatsAgent: get_reactive_table([0, 0, 1], [[0, 1], [0, 2], [0, 2]]),
+    # state is whether the opponent has ever defected
+    GrudgerAgent: get_reactive_table([0, 1], [[0, 1], [1, 1]]),
+    # four feeler rounds (cooperate, defect, cooperate, cooperate), each with and without the opponent having cheated, then
+    # defect forever while they never cheat, or tit for tat once they have
+    DetectiveAgent: get_reactive_table(
+        [0, 1, 1, 0, 0, 0, 0, 1, 0, 1],
+        [
+            [1, 2],  # 0: first round
+            [3, 4],  # 1: second round
+            [4, 4],  # 2: second round, cheated
+            [5, 6],  # 3: third round
+            [6, 6],  # 4: third round, cheated
+            [7, 9],  # 5: fourth round
+            [8, 9],  # 6: fourth round, cheated
+            [7, 9],  # 7: never cheated
+            [8, 9],  # 8: cheated, last cooperated
+            [8, 9],  # 9: cheated, last defected
+        ],
+    ),
+}
+
+
+# add the table that an agent class plays as
+def register_strategy_table(agent_type, table):
+    STRATEGY_TABLES[agent_type] = table
+    return
+
+
+# agent that plays any strategy table, taking one draw of the game's random numbers every round if it has random states
+class TableAgent(Agent):
+    # pass in the table to play
+    def __init__(self, name, table):
+        self.__table = table
+        super().__init__(name)
+        self.deterministic = table.is_deterministic()
+        return
+
+    # return the table played
+    def get_table(self):
+        return self.__table
+
+    # agents playing the same table behave alike
+    def get_params(self):
+        return {"defect": tuple(self.__table.get_defect().tolist()), "transitions": tuple(self.__table.get_transitions().ravel().tolist())}
+
+    # every game starts in the first state
+    def reset(self, position):
+        super().reset(position)
+        self.__state = 0
+        return
+
+    def observe(self, round):
+        choices = round.get_choices()
+        self.__state = int(self.__table.get_transitions()[self.__state, choices[self.get_position()], choices[1 - self.get_position()]])
+        return
+
+    # decision depends only on the current state
+    def get_state(self):
+        return self.__state
+
+    # tables with any random state take the round's draw even in fixed states, so draws line up with rounds as in the
+    # batch engine, where a fixed state compares it against 0 or 1
+    def play(self):
+        defect = self.__table.get_defect()[self.__state]
+        if self.deterministic:
+            return (Choice.DEFECT if defect == 1 else Choice.COOPERATE)
+        return (Choice.DEFECT if self.random() < defect else Choice.COOPERATE)
+
+
+# return the table an agent plays, or None if it is not a finite-state agent
+def get_strategy_table(agent):
+    if isinstance(agent, TableAgent):
+        return agent.get_table()
+    return STRATEGY_TABLES.get(type(agent))
+
+
+# join tables into one, with a first state that stays put and always cooperates for agents that have no table,
+# return defect probabilities and transitions of the joined table and the offset of each table's states within it
+def combine_tables(tables):
+    offsets = []
+    defect, transitions = [np.zeros(1)], [np.zeros((1, 2, 2), dtype=np.int16)]
+    n_states = 1
+    for table in tables:
+        offsets.append(n_states)
+        defect.append(table.get_defect())
+        transitions.append(table.get_transitions() + n_states)
+        n_states += len(table)
+    return np.concatenate(defect), np.concatenate(transitions), offsets
+
+
+# personality parameters given to agents that are not Picard agents when games are stepped as arrays, never used to decide
+PLACEHOLDER_PARAMS = {"a": 1.0, "b": 1.0, "e": 0.0}
+# parameters of the batch engine that describe the joined strategy table rather than each agent
+TABLE_PARAMS = ("defect", "transitions")
+
+
+# return the parameters of the batch engine for agents playing tables, given the index of each agent's table within
+# tables (-1 for Picard agents): whether each is a Picard agent, the state it starts in, whether its play needs random
+# numbers, and the joined table
+def get_table_params(table_ids, tables):
+    table_ids = np.asarray(table_ids, dtype=np.int64)
+    defect, transitions, offsets = combine_tables(tables)
+    # index -1 reads the value appended for Picard agents
+    starts = np.append(np.array(offsets, dtype=np.int64), 0)
+    deterministic = np.append(np.array([table.is_deterministic() for table in tables], dtype=bool), False)
+    return {"picard": (table_ids < 0), "state": starts[table_ids], "deterministic": deterministic[table_ids], "defect": defect, "transitions": transitions}
+
+
+# return the parameters of the agents at the given indices, as if they were the only agents
+def select_params(params, indices):
+    return {key: (values if key in TABLE_PARAMS else values[indices]) for (key, values) in params.items()}
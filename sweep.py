@@ -0,0 +1,115 @@
+# Isaac Joffe (2024)
+
+
+# basic built-in libraries required
+import numpy as np
+import itertools
+# other code developed for project
+from tournament import *
+from parallel import *
+
+
+# parameters of Picard agents, different values can play each other in the same tournament
+AGENT_AXES = ("a", "b", "e")
+# parameters shared by a whole population, different values need separate tournaments
+ENVIRONMENT_AXES = ("noise_param", "cognitive_param")
+# value of agent parameters that are not swept, environment ones default to module-level values
+DEFAULTS = {"a": 1, "b": 1, "e": 0}
+
+
+# declarative set of points in parameter space to test
+class Sweep():
+    # axes map parameter names to a list of values for grid sampling, or a (low, high) range for random and
+    # Latin hypercube sampling, where n_points are drawn from the seed and optionally rounded to some decimals
+    def __init__(self, axes, method="grid", n_points=None, seed=None, decimals=None):
+        for name in axes:
+            if name not in AGENT_AXES + ENVIRONMENT_AXES:
+                raise ValueError(f"Cannot sweep unknown parameter {name}")
+        if (method != "grid") and (n_points is None):
+            raise ValueError("Sampled sweeps need a number of points")
+        self.__axes = axes
+        self.__method = method
+        self.__n_points = n_points
+        self.__seed = seed
+        self.__decimals = decimals
+        return
+
+    # return every point of the sweep as a dictionary of the swept parameter values
+    def get_points(self):
+        names = list(self.__axes)
+        rng = np.random.default_rng(self.__seed)
+        if self.__method == "grid":
+            values = np.array(list(itertools.product(*[self.__axes[name] for name in names])), dtype=float)
+        elif self.__method == "random":
+            # independent uniform draws over each range
+            values = rng.random((self.__n_points, len(names)))
+        elif self.__method == "lhs":
+            # each range is split into n_points strata and every stratum is sampled exactly once per parameter
+            values = (np.array([rng.permutation(self.__n_points) for name in names]).T + rng.random((self.__n_points, len(names)))) / self.__n_points
+        else:
+            raise ValueError(f"Unknown sampling method {self.__method}")
+        if self.__method != "grid":
+            low = np.array([self.__axes[name][0] for name in names])
+            high = np.array([self.__axes[name][1] for name in names])
+            values = low + values * (high - low)
+        if self.__decimals is not None:
+            values = np.round(values, self.__decimals)
+        # environment parameters are integers in the model
+        points = [dict(zip(names, row.tolist())) for row in values]
+        for point in points:
+            for name in ENVIRONMENT_AXES:
+                if name in point:
+                    point[name] = int(round(point[name]))
+        return points
+
+    # return one Picard agent per point, named with a format string over its parameters
+    def get_agents(self, name="a={a:.2f},b={b:.2f},e={e:.2f}"):
+        agents = []
+        for point in self.get_points():
+            params = dict(DEFAULTS, **point)
+            agents.append(PicardAgent(name.format(**params), params))
+        return agents
+
+
+# play all tournaments of a sweep as one job, return table with average per game and spread of each point, timings of
+# the tournaments are added to metrics if given
+def run_sweep(sweep, n_iterations, reward_matrix, n_err=10, n_trials=100, seed=None, n_workers=None, engine=BatchTournament, metrics=None):
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    points = sweep.get_points()
+
+    # points with the same environment play in one tournament, identical points share one agent
+    environments = {}
+    for point in points:
+        environment = tuple(point.get(name) for name in ENVIRONMENT_AXES)
+        agent = tuple(point.get(name, DEFAULTS[name]) for name in AGENT_AXES)
+        agents = environments.setdefault(environment, {})
+        agents.setdefault(agent, len(agents))
+    setups = []
+    for (environment, agents) in environments.items():
+        overrides = {name: value for (name, value) in zip(ENVIRONMENT_AXES, environment) if value is not None}
+        setups.append((engine, n_iterations, reward_matrix, [PicardAgent(str(agent), dict(zip(AGENT_AXES, agent), **overrides)) for agent in agents]))
+
+    # schedule every tournament of every environment together, seeded by environment and (k, trial) position
+    tasks = [(s, derive_seed(seed, s, k, i)) for s in range(len(setups)) for k in range(n_err) for i in range(n_trials)]
+    totals = [np.zeros((n_err, len(setup[3]))) for setup in setups]
+    results = play_tournament_batch(setups, tasks, n_workers, metrics)
+    for (s, k, i) in [(s, k, i) for s in range(len(setups)) for k in range(n_err) for i in range(n_trials)]:
+        totals[s][k] = totals[s][k] + np.array(next(results)) / (len(setups[s][3]) + 1) / n_trials
+    results.close()
+
+    # one row per sweep point, with unswept parameters filled in by their defaults
+    table = np.zeros(len(points), dtype=[(name, float) for name in AGENT_AXES] + [(name, int) for name in ENVIRONMENT_AXES] + [("mean", float), ("min", float), ("max", float)])
+    for (row, point) in enumerate(points):
+        environment = tuple(point.get(name) for name in ENVIRONMENT_AXES)
+        s = list(environments).index(environment)
+        j = environments[environment][tuple(point.get(name, DEFAULTS[name]) for name in AGENT_AXES)]
+        agent = setups[s][3][j]
+        for name in AGENT_AXES:
+            table[row][name] = agent.get_params()[name]
+        table[row]["noise_param"] = agent.get_noise_param()
+        table[row]["cognitive_param"] = agent.get_cognitive_param()
+        table[row]["mean"] = np.mean(totals[s][:, j])
+        table[row]["min"] = np.min(totals[s][:, j])
+        table[row]["max"] = np.max(totals[s][:, j])
+    return table
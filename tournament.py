@@ -3,11 +3,14 @@
 
 # basic built-in libraries required
 import numpy as np
-import copy
+import multiprocessing
+import time
 # other code developed for project
 from agents import *
 from rational_agents import *
 from emotional_agents import *
+from metrics import *
+from shared import *
 
 
 # represents a single round of the PD
@@ -16,6 +19,13 @@ class PrisonersDilemma():
     def __init__(self, iteration, reward_matrix, agent_a, agent_b):
         self.__iteration = iteration
         self.__reward_matrix = reward_matrix
+        # scores of both agents indexed by their choices, so each round is a lookup rather than a chain of comparisons
+        self.__payoffs = (
+            # both cooperate get second-maximum reward, lone cooperator gets minimal reward and defector maximal reward
+            ((reward_matrix[2], reward_matrix[2]), (reward_matrix[0], reward_matrix[3])),
+            # lone defector gets maximal reward and cooperator minimal reward, both defect get second-minimum reward
+            ((reward_matrix[3], reward_matrix[0]), (reward_matrix[1], reward_matrix[1])),
+        )
         self.__agent_a = agent_a
         self.__agent_b = agent_b
         self.__choices = None
@@ -32,20 +42,7 @@ class PrisonersDilemma():
 
     # determine the scores acheieved by each agent this round
     def compute_rewards(self, choices):
-        scores = (None, None)
-        if (choices[0] == Choice.COOPERATE) and (choices[1] == Choice.COOPERATE):
-            # both get second-maximum reward
-            scores = (self.__reward_matrix[2], self.__reward_matrix[2])
-        elif (choices[0] == Choice.COOPERATE) and (choices[1] == Choice.DEFECT):
-            # cooperator gets minimal reward, defector gets maximal reward
-            scores = (self.__reward_matrix[0], self.__reward_matrix[3])
-        elif (choices[0] == Choice.DEFECT) and (choices[1] == Choice.COOPERATE):
-            # defector gets maximal reward, cooperator gets minimal reward
-            scores = (self.__reward_matrix[3], self.__reward_matrix[0])
-        elif (choices[0] == Choice.DEFECT) and (choices[1] == Choice.DEFECT):
-            # both get second-minimum reward
-            scores = (self.__reward_matrix[1], self.__reward_matrix[1])
-        return scores
+        return self.__payoffs[choices[0]][choices[1]]
 
     # play a round of the PD game
     def play(self):
@@ -59,13 +56,25 @@ class PrisonersDilemma():
 
 # represents many rounds of the PD
 class IteratedPrisonersDilemma():
-    # set up game with length, structure, and players
-    def __init__(self, n_iterations, reward_matrix, agent_a, agent_b):
+    # set up game with length, structure, and players, optionally skip ahead once deterministic play repeats,
+    # with the seed (or generator) of the game's own random stream, and optionally timing each phase of every round into
+    # metrics
+    def __init__(self, n_iterations, reward_matrix, agent_a, agent_b, detect_cycles=True, seed=None, metrics=None):
         self.__n_iterations = n_iterations
         self.__reward_matrix = reward_matrix
         self.__agent_a = agent_a
         self.__agent_b = agent_b
-        self.__history = [0] * self.__n_iterations
+        self.__detect_cycles = detect_cycles and agent_a.deterministic and agent_b.deterministic
+        # rounds are logged compactly in preallocated arrays, agents read from this same log
+        self.__history = History(self.__n_iterations, get_score_dtype(reward_matrix))
+        self.__agent_a.share_history(self.__history)
+        self.__agent_b.share_history(self.__history)
+        # random numbers for the whole game are drawn up front in one block, one column per agent
+        if not (self.__agent_a.deterministic and self.__agent_b.deterministic):
+            draws = np.random.default_rng(seed).random((self.__n_iterations, 2))
+            self.__agent_a.set_random(draws[:, 0].tolist())
+            self.__agent_b.set_random(draws[:, 1].tolist())
+        self.__metrics = metrics
         self.__scores = (0, 0)
         return
 
@@ -86,30 +95,161 @@ class IteratedPrisonersDilemma():
         # print(f"{self.__agent_b} Score: {self.get_scores()[1]} ({(self.get_scores()[1] / len(history)):.2f} per round)")
         return
 
+    # finish the game in closed form once rounds from start onwards are known to repeat forever
+    def skip_cycle(self, start):
+        played = len(self.__history)
+        n_remaining = self.__n_iterations - played
+        n_cycles, n_extra = divmod(n_remaining, played - start)
+        # remaining rounds are whole cycles followed by the beginning of one more
+        cycle = self.__history.get_scores()[start:played]
+        scores = (n_cycles * cycle.sum(axis=0) + cycle[:n_extra].sum(axis=0)).tolist()
+        self.__history.repeat(start, n_remaining)
+        self.__agent_a.add_score(scores[0]), self.__agent_b.add_score(scores[1])
+        self.__scores = (self.__scores[0] + scores[0], self.__scores[1] + scores[1])
+        return
+
     # play the PD game for the desired number of rounds
     def play(self):
+        # single PD only used to look up rewards, rounds themselves are not kept as objects
+        rules = PrisonersDilemma(None, self.__reward_matrix, self.__agent_a, self.__agent_b)
+        # round at which each joint state of deterministic agents was first seen
+        states = {}
+        # instrumented games use a separate copy of the loop, so games without metrics pay nothing for them
+        if self.__metrics is not None:
+            return self.play_timed(rules, states)
         for i in range(self.__n_iterations):
-            # play the current iteration of the PD, previous rounds knowledge stored in agents
-            round = PrisonersDilemma(
-                i,
-                self.__reward_matrix,
-                self.__agent_a,
-                self.__agent_b,
-            )
-            self.__history[i] = round.play()
+            # deterministic agents in a previously seen joint state will repeat the same rounds from then on
+            if self.__detect_cycles:
+                state = (self.__agent_a.get_state(), self.__agent_b.get_state())
+                if state in states:
+                    self.skip_cycle(states[state])
+                    break
+                states[state] = i
+            # play the current iteration of the PD, previous rounds knowledge stored in shared log
+            choices = self.__agent_a.play(), self.__agent_b.play()
+            scores = rules.compute_rewards(choices)
+            round = self.__history.append(choices, scores)
+            self.__agent_a.update_history(round), self.__agent_b.update_history(round)
             # log total scores for each agent
-            self.__scores = (self.__scores[0] + self.__history[i].get_scores()[0], self.__scores[1] + self.__history[i].get_scores()[1])
+            self.__scores = (self.__scores[0] + scores[0], self.__scores[1] + scores[1])
         return self
 
+    # same loop as play, but timing cycle detection, each agent's decision, reward lookup, and history bookkeeping
+    def play_timed(self, rules, states):
+        clock = time.perf_counter
+        cycles, decide_a, decide_b, rewards, bookkeeping = 0, 0, 0, 0, 0
+        n_played = 0
+        for i in range(self.__n_iterations):
+            start = clock()
+            if self.__detect_cycles:
+                state = (self.__agent_a.get_state(), self.__agent_b.get_state())
+                if state in states:
+                    self.skip_cycle(states[state])
+                    cycles += clock() - start
+                    self.__metrics.add_count("rounds skipped", self.__n_iterations - i)
+                    break
+                states[state] = i
+            decided = clock()
+            choice_a = self.__agent_a.play()
+            decided_a = clock()
+            choice_b = self.__agent_b.play()
+            decided_b = clock()
+            choices = choice_a, choice_b
+            scores = rules.compute_rewards(choices)
+            rewarded = clock()
+            round = self.__history.append(choices, scores)
+            self.__agent_a.update_history(round), self.__agent_b.update_history(round)
+            self.__scores = (self.__scores[0] + scores[0], self.__scores[1] + scores[1])
+            recorded = clock()
+            cycles += decided - start
+            decide_a += decided_a - decided
+            decide_b += decided_b - decided_a
+            rewards += rewarded - decided_b
+            bookkeeping += recorded - rewarded
+            n_played += 1
+        if self.__detect_cycles:
+            self.__metrics.add_time("cycle detection", cycles, n_played)
+        self.__metrics.add_time("decisions", decide_a + decide_b, 2 * n_played)
+        self.__metrics.add_time("rewards", rewards, n_played)
+        self.__metrics.add_time("history", bookkeeping, n_played)
+        self.__metrics.add_decisions(type(self.__agent_a).__name__, n_played, decide_a)
+        self.__metrics.add_decisions(type(self.__agent_b).__name__, n_played, decide_b)
+        self.__metrics.add_count("rounds played", n_played)
+        return self
+
+
+# derive an independent seed sequence from a base seed (or seed sequence) and a position within a larger run,
+# the same as spawning children in order but without needing the others
+def derive_seed(seed, *key):
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.SeedSequence(seed.entropy, spawn_key=(seed.spawn_key + key))
+    return np.random.SeedSequence(seed, spawn_key=key)
+
+
+# return a generator of the random numbers of the k-th game of a run seeded by seed, where every game takes its own block
+# of 2 * n_iterations numbers from one stream, so consecutive games can draw theirs in one call without seeding each
+def get_game_generator(seed, k, n_iterations):
+    return np.random.Generator(np.random.PCG64(seed).advance(2 * int(k) * n_iterations))
+
+
+# arrange scores of every matchup of a round robin, in matchup order, into the score of each agent (row) against each
+# agent (column), where an agent's score against itself is the average of both sides
+def get_payoff_matrix(n_agents, matchup_scores):
+    scores = np.asarray(matchup_scores, dtype=float).reshape(-1, 2)
+    i, j = np.triu_indices(n_agents)
+    payoffs = np.zeros((n_agents, n_agents))
+    payoffs[i, j] = scores[:, 0]
+    payoffs[j, i] = scores[:, 1]
+    payoffs[i[i == j], j[i == j]] = scores[i == j].mean(axis=1)
+    return payoffs
+
+
+# tournament being played by this worker process, and the shared array its matchup scores are written to,
+# set once when the worker starts
+worker_tournament = None
+worker_matchup_scores = None
+
+
+# store tournament in worker process so it is only sent once rather than with every task
+def init_matchup_worker(tournament, matchup_scores):
+    global worker_tournament, worker_matchup_scores
+    worker_tournament = tournament
+    worker_matchup_scores = matchup_scores
+    return
+
+
+# play a chunk of matchups inside a worker process, scores are written straight into their slots of the shared array,
+# so only the moves (if they are streamed) and what was measured (if the tournament is instrumented) are sent back
+def play_matchups(matchups):
+    metrics = worker_tournament.get_metrics()
+    if metrics is not None:
+        metrics.clear()
+    moves = []
+    for (k, i, j) in matchups:
+        matchup = worker_tournament.play_matchup(k, i, j)
+        worker_matchup_scores.get_array()[k] = matchup.get_scores()
+        moves.append(worker_tournament.get_moves(matchup))
+    return moves, metrics
+
 
 # represents a tournament of many agents playing the IPD
 class Tournament():
-    # set up tournament with IPD parameters and agents to test
-    def __init__(self, n_iterations, reward_matrix, agents):
+    # set up tournament with IPD parameters and agents to test, optionally spread over worker processes,
+    # reusing results of deterministic matchups from a cache, streaming finished matchups to a writer, and collecting
+    # timings into metrics
+    def __init__(self, n_iterations, reward_matrix, agents, n_workers=1, seed=None, cache=None, sink=None, metrics=None):
         self.__n_iterations = n_iterations
         self.__reward_matrix = reward_matrix
         self.__agents = agents
+        self.__n_workers = n_workers
+        # every game gets its own block of one random stream seeded by this, so results do not depend on how games are
+        # scheduled
+        self.__seed = (seed if seed is not None else np.random.SeedSequence())
+        self.__cache = cache
+        self.__sink = sink
+        self.__metrics = metrics
         self.__matchups = []
+        self.__matchup_scores = None
         self.__scores = [0] * len(self.__agents)
         return
 
@@ -117,6 +257,14 @@ class Tournament():
     def get_scores(self):
         return self.__scores
 
+    # return where timings are being collected, or None if the tournament is not instrumented
+    def get_metrics(self):
+        return self.__metrics
+
+    # return score of each agent (row) against each agent (column) in the tournament played
+    def get_payoffs(self):
+        return get_payoff_matrix(len(self.__agents), self.__matchup_scores)
+
     # display overall results of the tournament
     def print_results(self):
         # print()
@@ -130,39 +278,118 @@ class Tournament():
         # print()
         return
 
+    # return the choices made in a game if they are being streamed to the writer, otherwise nothing
+    def get_moves(self, matchup):
+        if (self.__sink is not None) and self.__sink.keeps_moves():
+            return matchup.get_history().get_choices()
+        return None
+
+    # identify the matchup between agents at indices i and j for the results cache
+    def get_matchup_key(self, i, j):
+        return self.__cache.get_key(self.__agents[i], self.__agents[j], self.__n_iterations, self.__reward_matrix)
+
+    # play the k-th matchup of the round robin, between agents at indices i and j
+    def play_matchup(self, k, i, j):
+        # create fresh version of agents to play the game
+        with timer(self.__metrics, "clone"):
+            agent_a = self.__agents[i].clone(0)
+            agent_b = self.__agents[j].clone(1)
+
+        # run the IPD between these agents
+        with timer(self.__metrics, "setup"):
+            matchup = IteratedPrisonersDilemma(
+                self.__n_iterations,
+                self.__reward_matrix,
+                agent_a,
+                agent_b,
+                seed=get_game_generator(self.__seed, k, self.__n_iterations),
+                metrics=self.__metrics,
+            )
+        with timer(self.__metrics, "game"):
+            matchup.play()
+        return matchup
+
     # play a round robin of the IPD
     def play(self):
+        with timer(self.__metrics, "tournament"):
+            return self.play_round_robin()
+
+    # play every matchup of the round robin and total the scores
+    def play_round_robin(self):
         # each agent plays all others once and itself
+        matchups = []
         k = 0
         for i in range(len(self.__agents)):
             for j in range(i, len(self.__agents)):
+                matchups.append((k, i, j))
+                k += 1
+        if self.__sink is not None:
+            self.__sink.start_tournament()
+
+        # deterministic matchups played before are looked up rather than played again
+        matchup_scores = [None] * len(matchups)
+        if self.__cache is not None:
+            with timer(self.__metrics, "cache"):
+                for (k, i, j) in matchups:
+                    if self.__agents[i].deterministic and self.__agents[j].deterministic:
+                        matchup_scores[k] = self.__cache.get(self.get_matchup_key(i, j))
+                        if (matchup_scores[k] is not None) and (self.__sink is not None):
+                            self.__sink.write(i, j, matchup_scores[k])
+        pending = [(k, i, j) for (k, i, j) in matchups if matchup_scores[k] is None]
+        if self.__metrics is not None:
+            if self.__cache is not None:
+                self.__metrics.add_count("matchups cached", len(matchups) - len(pending))
+            self.__metrics.add_count("matchups played", len(pending))
+
+        if self.__n_workers == 1:
+            for (k, i, j) in pending:
                 # print information to track progress of tournament
                 # print("----------------------------------------------------")
                 # print(f"----- Matchup {k}:  {self.__agents[i]} vs. {self.__agents[j]} -----")
                 # print("----------------------------------------------------")
-                k += 1
-
-                # create fresh version of agents to play the game
-                agent_a = copy.deepcopy(self.__agents[i])
-                agent_b = copy.deepcopy(self.__agents[j])
-                agent_a.reset(0)
-                agent_b.reset(1)
-
-                # run the IPD between these agents
-                matchup = IteratedPrisonersDilemma(
-                    self.__n_iterations,
-                    self.__reward_matrix,
-                    agent_a,
-                    agent_b,
-                )
-                self.__matchups.append(matchup.play())
-
-                # track results of tournament
-                self.__scores[i] += self.__matchups[-1].get_scores()[0]
-                self.__scores[j] += self.__matchups[-1].get_scores()[1]
+                matchup = self.play_matchup(k, i, j)
+                matchup_scores[k] = matchup.get_scores()
 
                 # display results of each matchup
-                self.__matchups[-1].print_results()
+                matchup.print_results()
+
+                # either stream summary of the game to disk or keep the whole game in memory
+                if self.__sink is None:
+                    self.__matchups.append(matchup)
+                else:
+                    with timer(self.__metrics, "sink"):
+                        self.__sink.write(i, j, matchup_scores[k], self.get_moves(matchup))
+        else:
+            # split matchups into a few interleaved chunks per worker to balance load, games themselves are not kept
+            n_chunks = 4 * (self.__n_workers or multiprocessing.cpu_count())
+            chunks = [pending[c::n_chunks] for c in range(n_chunks)]
+            integer = np.issubdtype(np.asarray(self.__reward_matrix).dtype, np.integer)
+            with SharedArray((len(matchups), 2), (np.int64 if integer else np.float64)) as shared_scores:
+                with multiprocessing.Pool(self.__n_workers, initializer=init_matchup_worker, initargs=(self, shared_scores)) as pool:
+                    results = pool.map(play_matchups, chunks)
+                for c in range(n_chunks):
+                    moves, metrics = results[c]
+                    if metrics is not None:
+                        self.__metrics.merge(metrics)
+                    for ((k, i, j), matchup_moves) in zip(chunks[c], moves):
+                        matchup_scores[k] = tuple(shared_scores.get_array()[k].tolist())
+                        if self.__sink is not None:
+                            with timer(self.__metrics, "sink"):
+                                self.__sink.write(i, j, matchup_scores[k], matchup_moves)
+
+        # remember newly played deterministic matchups for later tournaments
+        if self.__cache is not None:
+            for (k, i, j) in pending:
+                if self.__agents[i].deterministic and self.__agents[j].deterministic:
+                    self.__cache.put(self.get_matchup_key(i, j), matchup_scores[k])
+
+        # track results of tournament, in matchup order so totals are summed the same however they were played
+        self.__matchup_scores = matchup_scores
+        for (k, i, j) in matchups:
+            self.__scores[i] += matchup_scores[k][0]
+            self.__scores[j] += matchup_scores[k][1]
+            if self.__metrics is not None:
+                self.__metrics.add_matchup(type(self.__agents[i]).__name__, type(self.__agents[j]).__name__, matchup_scores[k])
 
         # display summary of entire tournament results
         # print("----------------------------------------------------")